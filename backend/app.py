@@ -1,34 +1,100 @@
+import json
 import os
-import joblib
 from backend.core import create_app
+from backend.core.logging_config import configure_logging
 from backend.core.routes import register_routes
 from backend.core.services.chat_service import ConversationManager
+from backend.core.services.intent_service import FastIntentScorer, IntentClassifier, MicroBatcher
+from backend.core.services.search_service import answer_cache
+from backend.core.services.session_store import create_session_store
+from backend.core.services.snapshot_service import CacheSnapshotter
+from backend.core.services.tts_service import AudioCache, AudioJanitor
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), 'frontend')
-TEMP_DIR = os.path.join(BASE_DIR, 'temp')
+# Speech clips and cache snapshots. On a persistent disk, restarts and
+# deploys start with the previous process's answers and audio.
+TEMP_DIR = os.environ.get('ECHO_CACHE_DIR', os.path.join(BASE_DIR, 'temp'))
+SNAPSHOT_INTERVAL = int(os.environ.get('ECHO_CACHE_SNAPSHOT_INTERVAL', 300))
+
+# Before the model starts loading, so its messages are not lost
+logger = configure_logging().getChild('app')
 
 if not os.path.exists(TEMP_DIR):
     os.makedirs(TEMP_DIR)
 
-# Load Model/Data
-print("Loading ML Model...")
-try:
-    model = joblib.load(os.path.join(BASE_DIR, 'chat_model.pkl'))
-    responses_data = joblib.load(os.path.join(BASE_DIR, 'responses.pkl'))
-    print("Model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-    responses_data = {}
+# 'background' (default) starts serving right away and loads the intent
+# model on a thread; 'lazy' loads it on the first query that needs it;
+# 'eager' loads it before the app is created.
+MODEL_LOAD = os.environ.get('ECHO_MODEL_LOAD', 'background')
+
+def load_responses():
+    # responses.json is written by train_model.py: canned replies plus the
+    # exact training patterns, so small talk works before the model is loaded
+    path = os.path.join(BASE_DIR, 'responses.json')
+    try:
+        if os.path.exists(path):
+            with open(path) as f:
+                bank = json.load(f)
+            return {tag: tuple(replies) for tag, replies in bank['responses'].items()}, bank.get('patterns', {})
+        import joblib
+        return joblib.load(os.path.join(BASE_DIR, 'responses.pkl')), {}
+    except Exception as e:
+        logger.error("Error loading responses: %s", e)
+        return {}, {}
+
+def load_model():
+    logger.info("Loading ML Model...")
+    scorer_path = os.path.join(BASE_DIR, 'intent_scorer.npz')
+    if os.path.exists(scorer_path):
+        # Same labels as the sklearn pipeline, without its per-call overhead
+        model = FastIntentScorer.load(scorer_path)
+    else:
+        import joblib  # imports sklearn while unpickling
+        model = joblib.load(os.path.join(BASE_DIR, 'chat_model.pkl'))
+        # Concurrent /process requests share one model call. Only worth it for
+        # the sklearn pipeline; the NumPy scorer is cheaper than the hand-off.
+        model = MicroBatcher(
+            model,
+            max_batch=int(os.environ.get('ECHO_INTENT_MAX_BATCH', 64)),
+            max_wait=float(os.environ.get('ECHO_INTENT_BATCH_WAIT_MS', 0)) / 1000
+        )
+    logger.info("Model loaded successfully.")
+    return model
 
 # Initialize shared components
-conversation_manager = ConversationManager()
+responses_data, patterns = load_responses()
+intent_model = IntentClassifier(
+    thresholds=IntentClassifier.load_thresholds(os.path.join(BASE_DIR, 'intent_thresholds.json')),
+    patterns=patterns,
+    loader=load_model,
+    load_on_demand=MODEL_LOAD == 'lazy'
+)
+if MODEL_LOAD == 'eager':
+    intent_model.load()
+elif MODEL_LOAD == 'background':
+    intent_model.load_in_background()
+conversation_manager = ConversationManager(store=create_session_store(
+    os.environ.get('ECHO_SESSION_STORE', 'memory'),
+    max_history=int(os.environ.get('ECHO_MAX_HISTORY', 50)),
+    session_ttl=int(os.environ.get('ECHO_SESSION_TTL', 1800)),
+    max_sessions=int(os.environ.get('ECHO_MAX_SESSIONS', 10000))
+))
+audio_cache = AudioCache(
+    TEMP_DIR,
+    max_bytes=int(os.environ.get('ECHO_TTS_CACHE_MB', 200)) * 1024 * 1024,
+    retention=int(os.environ.get('ECHO_AUDIO_RETENTION', 24 * 3600))
+)
+AudioJanitor(audio_cache).start()
+if SNAPSHOT_INTERVAL > 0:
+    snapshotter = CacheSnapshotter(answer_cache, TEMP_DIR, audio_cache, interval=SNAPSHOT_INTERVAL)
+    snapshotter.load()
+    snapshotter.start()
 
 # Create and configure app
 app = create_app(FRONTEND_DIR)
-register_routes(app, model, responses_data, conversation_manager, TEMP_DIR, FRONTEND_DIR)
+register_routes(app, intent_model, responses_data, conversation_manager, audio_cache, FRONTEND_DIR)
 
 if __name__ == '__main__':
-    print("Echo AI v2.1 (Modular) Starting...")
+    logger.info("Echo AI v2.1 (Modular) Starting...")
     app.run(debug=True, port=5000, threaded=True, host='0.0.0.0')
@@ -0,0 +1,6 @@
+from backend.app import app as flask_app, intent_model, responses_data, conversation_manager, audio_cache
+from backend.core.asgi import create_asgi_app
+
+# Async serving mode: uvicorn backend.asgi:app
+# The sync mode (gunicorn backend.app:app) is unchanged.
+app = create_asgi_app(flask_app, intent_model, responses_data, conversation_manager, audio_cache)
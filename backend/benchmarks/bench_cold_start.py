@@ -0,0 +1,50 @@
+"""
+Cold start: time to import backend.app and to answer the first requests,
+each measured in a fresh interpreter (median of several runs).
+
+    python -m backend.benchmarks.bench_cold_start
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RUNS = 7
+
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+from backend.app import app
+imported = time.perf_counter()
+client = app.test_client()
+client.get('/health')
+health = time.perf_counter()
+client.post('/process', json={'command': 'hi', 'session_id': 'cold'})
+greeting = time.perf_counter()
+client.post('/process', json={'command': 'what time is it', 'session_id': 'cold'})
+clock = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'first /health': health - start,
+    'first greeting': greeting - start,
+    'first time reply': clock - start,
+    'sklearn imported': 'sklearn' in sys.modules
+}))
+'''
+
+def main():
+    runs = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    for key in runs[0]:
+        if key == 'sklearn imported':
+            print(f"{key:<18} {runs[0][key]}")
+        else:
+            print(f"{key:<18} {statistics.median(run[key] for run in runs) * 1000:7.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Intent prediction throughput: batch sizes 1/8/64/512 through model.predict,
+and concurrent single predictions with and without the MicroBatcher.
+
+    python -m backend.benchmarks.bench_intent_batch
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+from backend.core.services.intent_service import MicroBatcher
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZES = [1, 8, 64, 512]
+N_TEXTS = 4096
+CONCURRENCY = 32
+
+def load_queries():
+    with open(os.path.join(BACKEND_DIR, 'intents.json')) as f:
+        patterns = [p for intent in json.load(f)['intents'] for p in intent['patterns']]
+    patterns += ["pm of india", "capital of France", "who is Elon Musk", "latest news about SpaceX"]
+    return [patterns[i % len(patterns)] for i in range(N_TEXTS)]
+
+def batch_throughput(model, queries, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        model.predict(queries[i:i + batch_size])
+    return len(queries) / (time.perf_counter() - start)
+
+def concurrent_throughput(predictor, queries):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(lambda q: predictor.predict([q])[0], queries))
+    return len(queries) / (time.perf_counter() - start)
+
+def main():
+    model = joblib.load(os.path.join(BACKEND_DIR, 'chat_model.pkl'))
+    queries = load_queries()
+    model.predict(queries[:8])  # warm up
+
+    print(f"model.predict, {N_TEXTS} texts")
+    for batch_size in BATCH_SIZES:
+        print(f"  batch {batch_size:>4}: {batch_throughput(model, queries, batch_size):>10.0f} predictions/s")
+
+    print(f"\nsingle predictions from {CONCURRENCY} threads")
+    print(f"  direct:         {concurrent_throughput(model, queries):>10.0f} predictions/s")
+    for max_wait in (0.0, 0.002):
+        batcher = MicroBatcher(model, max_batch=64, max_wait=max_wait)
+        rate = concurrent_throughput(batcher, queries)
+        print(f"  batched {max_wait * 1000:.0f} ms:   {rate:>10.0f} predictions/s (avg batch {batcher.stats()['avg_batch']})")
+
+if __name__ == '__main__':
+    main()
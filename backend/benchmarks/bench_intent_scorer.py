@@ -0,0 +1,34 @@
+"""
+Single-query and batch latency: sklearn pipeline vs FastIntentScorer.
+
+    python -m backend.benchmarks.bench_intent_scorer
+"""
+import os
+import time
+
+import joblib
+
+from backend.core.services.intent_service import FastIntentScorer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = ["hi", "what time is it", "pm of india", "tell me a joke", "who is the CEO of Tesla", "thanks a lot"]
+ROUNDS = 2000
+
+def per_call_us(predict, batch):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        predict(batch)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+def main():
+    model = joblib.load(os.path.join(BACKEND_DIR, 'chat_model.pkl'))
+    scorer = FastIntentScorer.load(os.path.join(BACKEND_DIR, 'intent_scorer.npz'))
+    batch = QUERIES * 10
+
+    for name, predict in (("sklearn pipeline", model.predict), ("FastIntentScorer", scorer.predict)):
+        single = per_call_us(predict, QUERIES[:1])
+        many = per_call_us(predict, batch)
+        print(f"{name:<17} 1 text: {single:8.1f} us/call   {len(batch)} texts: {many:8.1f} us/call")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Per-query cost of the generate_response keyword rules: the original
+per-rule scans vs the compiled single-pass matcher.
+
+    python -m backend.benchmarks.bench_keyword_matcher
+"""
+import random
+import time
+
+from backend.core.services.keyword_service import (
+    query_features, INFO_KEYWORDS, TIME_SENSITIVE_WORDS, GREETING_PHRASES
+)
+
+ROUNDS = 20
+
+SUBJECTS = ["India", "the eiffel tower", "SpaceX", "bitcoin", "mount everest", "Tokyo", "machine learning", "cats"]
+TEMPLATES = [
+    "hi", "hello there", "how are you", "thanks a lot", "tell me a joke", "what time is it",
+    "who is the prime minister of {}", "what is {}", "latest news about {}", "weather in {}",
+    "price of {}", "tell me about {}", "in {}", "population of {}", "where is {}",
+    "can you search for {} please", "when did {} happen", "{} history and facts"
+]
+
+def per_rule_scans(text):
+    text_lower = text.lower()
+    is_short = len(text.split()) < 5
+    is_connector = text_lower.startswith(("in ", "at ", "for ", "with ", "about ", "on ", "and "))
+    is_small_talk = text_lower in ["hi", "hello", "hey", "hey there"]
+    has_info_keyword = any(word in text_lower for word in INFO_KEYWORDS)
+    is_identity = any(text_lower.startswith(p) for p in ["who is", "what is", "tell me about", "define"])
+    is_joke = 'joke' in text.lower() or 'laugh' in text.lower()
+    question_words = ['who', 'what', 'where', 'when', 'why', 'how', 'is', 'can', 'does', 'do', 'search', 'tell me']
+    has_question_word = any(word in text_lower.split() for word in question_words)
+    is_greeting_phrase = any(p in text_lower for p in GREETING_PHRASES)
+    time_sensitive = any(w in text.lower() for w in TIME_SENSITIVE_WORDS)
+    return (is_short, is_connector, is_small_talk, has_info_keyword, is_identity, is_joke,
+            has_question_word, is_greeting_phrase, time_sensitive, len(text.split()))
+
+def us_per_query(fn, queries):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (ROUNDS * len(queries)) * 1e6
+
+def main():
+    rng = random.Random(42)
+    queries = [rng.choice(TEMPLATES).format(rng.choice(SUBJECTS)) for _ in range(10000)]
+    for name, fn in (("per-rule scans", per_rule_scans), ("compiled matcher", query_features)):
+        print(f"{name:<17} {us_per_query(fn, queries):6.2f} us/query")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Load test /process and /tts offline: the search and TTS clients are
+replaced by the stubs in stubs.py, with configurable latency and failure
+rates, so runs are reproducible and need no network. Reports throughput,
+p50/p95/p99 latency and errors per route at each concurrency level, plus
+process memory growth, and saves everything as JSON for comparison.
+
+    python -m backend.benchmarks.bench_load
+    python -m backend.benchmarks.bench_load --concurrency 1,16,64 --ddg-ms 400 --failure-rate 0.1
+    python -m backend.benchmarks.bench_load --server --out after.json --compare before.json
+
+By default requests go through the Flask test client; --server runs the
+app on a local werkzeug server and sends real HTTP requests instead.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.benchmarks.replay_routing import CORPUS
+from backend.benchmarks.stubs import Upstream, install
+from backend.core import create_app
+from backend.core.routes import register_routes
+from backend.core.services import chat_service, search_service
+from backend.core.services.chat_service import SEARCH_TIMEOUT_MESSAGE, ConversationManager
+from backend.core.services.search_service import CONNECTION_ERROR_MESSAGE
+from backend.core.services.intent_service import FastIntentScorer, IntentClassifier
+from backend.core.services.tts_service import AudioCache
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(BACKEND_DIR)
+
+# Replies of the length /tts usually receives
+TTS_TEXTS = [
+    "Hello! How can I help you today?",
+    "It is 10:30 AM.",
+    "Paris is the capital and largest city of France.",
+    "According to Wikipedia: Mount Everest is Earth's highest mountain above sea level.",
+    "Why don't scientists trust atoms? Because they make up everything.",
+    "I'm not sure how to respond to that. Could you try rephrasing?",
+]
+
+# Answered, but only with an apology because a backend failed or timed out
+DEGRADED_REPLIES = (CONNECTION_ERROR_MESSAGE, SEARCH_TIMEOUT_MESSAGE)
+
+def build_app(audio_dir):
+    os.makedirs(audio_dir, exist_ok=True)
+    with open(os.path.join(BACKEND_DIR, 'responses.json')) as f:
+        bank = json.load(f)
+    responses = {tag: tuple(replies) for tag, replies in bank['responses'].items()}
+    model = IntentClassifier(
+        FastIntentScorer.load(os.path.join(BACKEND_DIR, 'intent_scorer.npz')),
+        IntentClassifier.load_thresholds(os.path.join(BACKEND_DIR, 'intent_thresholds.json')),
+        patterns=bank.get('patterns', {})
+    )
+    app = create_app(os.path.join(ROOT, 'frontend'))
+    register_routes(app, model, responses, ConversationManager(), AudioCache(audio_dir), os.path.join(ROOT, 'frontend'))
+    return app
+
+def workload(n, tts_share, seed):
+    """The same list of (route, payload) for a given seed, sessions assigned round-robin."""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        if rng.random() < tts_share:
+            requests.append(('/tts', {'text': rng.choice(TTS_TEXTS)}))
+        else:
+            requests.append(('/process', {'command': rng.choice(CORPUS), 'session_id': f"bench_{i % 50}"}))
+    return requests
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def post(self, route, payload):
+        # One client per thread; the test client is not meant to be shared
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.post(route, json=payload)
+        return response.status_code, response.get_json()
+
+    def close(self):
+        pass
+
+class ServerDriver:
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def post(self, route, payload):
+        request = urllib.request.Request(
+            self.base + route, data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def close(self):
+        self.server.shutdown()
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        # Peak, not current, where /proc is unavailable
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+def run_level(driver, requests, concurrency):
+    latencies = {}
+    errors = {}
+    degraded = {}
+    lock = threading.Lock()
+
+    def one(item):
+        route, payload = item
+        start = time.perf_counter()
+        body = None
+        try:
+            status, body = driver.post(route, payload)
+            failed = status != 200 or not (body or {}).get('success', False)
+        except Exception:
+            failed = True
+        apology = not failed and (body or {}).get('response') in DEGRADED_REPLIES
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.setdefault(route, []).append(elapsed)
+            if failed:
+                errors[route] = errors.get(route, 0) + 1
+            if apology:
+                degraded[route] = degraded.get(route, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    wall = time.perf_counter() - start
+
+    routes = {}
+    for route, values in sorted(latencies.items()):
+        values.sort()
+        routes[route] = {
+            'requests': len(values),
+            'errors': errors.get(route, 0),
+            'degraded': degraded.get(route, 0),
+            'throughput': len(values) / wall,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+    return {'concurrency': concurrency, 'seconds': wall, 'throughput': len(requests) / wall, 'routes': routes}
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'commit': commit}
+
+def print_results(results, baseline=None):
+    previous = {}
+    if baseline:
+        for level in baseline['levels']:
+            for route, row in level['routes'].items():
+                previous[(level['concurrency'], route)] = row
+
+    print(f"{'conc':>4} {'route':<9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'degraded':>9}")
+    for level in results['levels']:
+        for route, row in level['routes'].items():
+            line = (f"{level['concurrency']:>4} {route:<9} {row['throughput']:>8.1f} {row['p50_ms']:>8.1f} "
+                    f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>7} {row['degraded']:>9}")
+            old = previous.get((level['concurrency'], route))
+            if old:
+                line += (f"   vs baseline: req/s {100 * (row['throughput'] / old['throughput'] - 1):+.0f}%, "
+                         f"p95 {100 * (row['p95_ms'] / old['p95_ms'] - 1):+.0f}%")
+            print(line)
+    memory = results['memory']
+    print(f"\nRSS {memory['start_mb']:.1f} MB -> {memory['end_mb']:.1f} MB ({memory['growth_mb']:+.1f} MB)")
+    print("upstream calls: " + ', '.join(f"{name} {stats['calls']} ({stats['failures']} failed)"
+                                         for name, stats in results['upstream'].items()))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test of /process and /tts.")
+    parser.add_argument('--concurrency', default='1,8,32', help="comma-separated client thread counts")
+    parser.add_argument('--requests', type=int, default=400, help="requests per concurrency level")
+    parser.add_argument('--tts-share', type=float, default=0.2, help="fraction of requests sent to /tts")
+    parser.add_argument('--ddg-ms', type=float, default=250, help="stubbed DuckDuckGo latency")
+    parser.add_argument('--wiki-ms', type=float, default=150, help="stubbed Wikipedia latency")
+    parser.add_argument('--tts-ms', type=float, default=300, help="stubbed gTTS latency")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="probability each stubbed call fails")
+    parser.add_argument('--search-mode', choices=['serial', 'race'], default=chat_service.SEARCH_MODE)
+    parser.add_argument('--server', action='store_true', help="send real HTTP requests to a local server")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="print changes relative to an earlier --out file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(c) for c in args.concurrency.split(',')]
+    upstreams = {
+        'ddg': Upstream(args.ddg_ms / 1000, failure_rate=args.failure_rate, seed=args.seed),
+        'wikipedia': Upstream(args.wiki_ms / 1000, failure_rate=args.failure_rate, seed=args.seed + 1),
+        'tts': Upstream(args.tts_ms / 1000, failure_rate=args.failure_rate, seed=args.seed + 2),
+    }
+    chat_service.SEARCH_MODE = args.search_mode
+
+    results = {'config': vars(args), 'environment': environment(), 'levels': []}
+    start_mb = rss_mb()
+    with install(**upstreams) as stubs, tempfile.TemporaryDirectory() as audio_root:
+        for i, concurrency in enumerate(levels):
+            # Every level starts cold and replays the same request sequence
+            search_service.answer_cache.clear()
+            search_service.reset_breakers()
+            app = build_app(os.path.join(audio_root, str(i)))
+            driver = ServerDriver(app) if args.server else TestClientDriver(app)
+            try:
+                results['levels'].append(run_level(driver, workload(args.requests, args.tts_share, args.seed), concurrency))
+            finally:
+                driver.close()
+        results['upstream'] = {name: upstream.stats() for name, upstream in stubs.items()}
+    end_mb = rss_mb()
+    results['memory'] = {'start_mb': start_mb, 'end_mb': end_mb, 'growth_mb': end_mb - start_mb}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nresults written to {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Bytes per stored chat message: legacy dict + ISO timestamp vs Message record.
+
+    python -m backend.benchmarks.bench_session_memory
+"""
+import gc
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from backend.core.services.session_store import Message
+
+N_MESSAGES = 50000
+INTENTS = ['greeting', 'time', 'date', 'jokes', None]
+
+def legacy_message(role, message, intent):
+    # The per-message dict ConversationManager used to store
+    return {
+        'role': role,
+        'message': message,
+        'timestamp': datetime.now().isoformat(),
+        'intent': intent
+    }
+
+def measure(factory, texts):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = deque(
+        factory('user' if i % 2 == 0 else 'assistant', texts[i], INTENTS[i % len(INTENTS)])
+        for i in range(N_MESSAGES)
+    )
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(history) == N_MESSAGES
+    return (after - before) / N_MESSAGES
+
+def main():
+    # Message text is allocated up front so only the per-record overhead is measured
+    texts = [f"what is the capital of country number {i}" for i in range(N_MESSAGES)]
+    legacy = measure(legacy_message, texts)
+    compact = measure(Message, texts)
+    print(f"messages stored:        {N_MESSAGES}")
+    print(f"legacy dict + ISO str:  {legacy:.1f} bytes/message")
+    print(f"Message (__slots__):    {compact:.1f} bytes/message")
+    print(f"saving:                 {100 * (1 - compact / legacy):.1f}%")
+
+if __name__ == '__main__':
+    main()
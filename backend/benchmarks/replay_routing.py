@@ -0,0 +1,85 @@
+"""
+Replay a query corpus through generate_response with the search backends
+stubbed out, and count remote lookups with and without confidence gating.
+
+    python -m backend.benchmarks.replay_routing
+"""
+import json
+import os
+from collections import Counter
+
+import joblib
+
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager, generate_response
+from backend.core.services.intent_service import FastIntentScorer, IntentClassifier, is_exact_pattern
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mix of small talk and information queries as they arrive at /process
+CORPUS = [
+    "hi", "hello", "hey there", "good morning", "how are you", "what's up",
+    "thanks", "thank you so much", "bye", "see you later", "good night",
+    "who are you", "what is your name", "tell me about yourself", "who made you",
+    "can you help me", "what can you do", "help me please",
+    "what time is it", "what is the time", "tell me the time please",
+    "what is the date today", "what day is it today",
+    "tell me a joke", "make me laugh",
+    "pm of india", "capital of France", "who is Elon Musk", "what is machine learning",
+    "latest news about SpaceX", "weather in London", "population of Japan",
+    "how tall is mount everest", "who won the world cup", "define photosynthesis",
+    "price of bitcoin", "where is the eiffel tower", "when did world war 2 end",
+    "calculate 12 * 7", "in India",
+]
+
+def replay(classifier, gated):
+    calls = Counter()
+    routes = {}
+
+    def fake_wikipedia(query):
+        calls['wikipedia'] += 1
+        return None
+
+    def fake_duckduckgo(query):
+        calls['duckduckgo'] += 1
+        return "According to Example: stub answer."
+
+    original = chat_service.search_wikipedia, chat_service.search_duckduckgo
+    chat_service.search_wikipedia, chat_service.search_duckduckgo = fake_wikipedia, fake_duckduckgo
+    try:
+        for i, query in enumerate(CORPUS):
+            intent, confidence, confident = classifier.classify([query])[0]
+            before = sum(calls.values())
+            generate_response(intent, query, f"replay_{i}", ConversationManager(), RESPONSES,
+                              confident if gated else None, exact=is_exact_pattern(classifier, query, intent))
+            routes[query] = sum(calls.values()) - before
+    finally:
+        chat_service.search_wikipedia, chat_service.search_duckduckgo = original
+    return calls, routes
+
+def main():
+    classifier = IntentClassifier(
+        FastIntentScorer.load(os.path.join(BACKEND_DIR, 'intent_scorer.npz')),
+        IntentClassifier.load_thresholds(os.path.join(BACKEND_DIR, 'intent_thresholds.json')),
+        PATTERNS
+    )
+    ungated_calls, ungated = replay(classifier, gated=False)
+    gated_calls, gated = replay(classifier, gated=True)
+
+    print(f"{'query':<32} {'ungated':>8} {'gated':>6}")
+    for query in CORPUS:
+        marker = '' if ungated[query] == gated[query] else '  *'
+        print(f"{query:<32} {ungated[query]:>8} {gated[query]:>6}{marker}")
+
+    total_before, total_after = sum(ungated_calls.values()), sum(gated_calls.values())
+    print(f"\nremote calls for {len(CORPUS)} queries: {total_before} ungated -> {total_after} gated "
+          f"({total_before - total_after} avoided)")
+    print(f"  ungated: {dict(ungated_calls)}")
+    print(f"  gated:   {dict(gated_calls)}")
+
+RESPONSES = joblib.load(os.path.join(BACKEND_DIR, 'responses.pkl'))
+with open(os.path.join(BACKEND_DIR, 'responses.json')) as f:
+    PATTERNS = json.load(f)['patterns']
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Offline stand-ins for the DuckDuckGo, Wikipedia and gTTS clients with
+configurable latency and failure rates, so the request path can be
+benchmarked without the network. Used by bench_load.py:
+
+    with install(ddg=Upstream(latency=0.3, failure_rate=0.05)):
+        ...  # search_service and tts_service now talk to the stubs
+"""
+import random
+import sys
+import time
+import types
+from contextlib import contextmanager
+from threading import Lock
+
+from backend.core.services import search_service
+
+class Upstream:
+    """
+    Behaviour of one stubbed backend: each call sleeps for ``latency``
+    seconds (uniformly +/- ``jitter`` of it) and then fails with
+    probability ``failure_rate``. Calls are counted per outcome.
+    """
+    def __init__(self, latency=0.0, jitter=0.25, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def call(self, name):
+        with self.lock:
+            self.calls += 1
+            delay = self.latency * (1 + self.jitter * (2 * self.random.random() - 1))
+            fail = self.random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"stubbed {name} failure")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'calls': self.calls, 'failures': self.failures}
+
+def fake_ddgs(upstream):
+    class DDGS:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def text(self, query, region=None, safesearch=None, timelimit=None, max_results=3):
+            upstream.call('duckduckgo')
+            return [{
+                'title': 'Example',
+                'href': 'https://example.com/' + '-'.join(query.lower().split()),
+                'body': f"Stub search result for {query}."
+            }][:max_results]
+    return DDGS
+
+def fake_wikipedia(upstream):
+    module = types.ModuleType('wikipedia')
+
+    class DisambiguationError(Exception):
+        def __init__(self, title, options):
+            super().__init__(title)
+            self.options = options
+
+    class PageError(Exception):
+        pass
+
+    def summary(query, sentences=2):
+        upstream.call('wikipedia')
+        return f"{query.strip().title()} is a stub Wikipedia article. It exists only in benchmarks."
+
+    module.summary = summary
+    module.exceptions = types.SimpleNamespace(DisambiguationError=DisambiguationError, PageError=PageError)
+    return module
+
+def fake_gtts(upstream, bytes_per_char=200):
+    module = types.ModuleType('gtts')
+
+    class gTTS:
+        def __init__(self, text, lang='en'):
+            self.text = text
+
+        def save(self, path):
+            upstream.call('gtts')
+            # Roughly the size of a real 32 kbps MP3 of the sentence
+            with open(path, 'wb') as f:
+                f.write(b'\xff\xf3' * (bytes_per_char * len(self.text) // 2))
+
+    module.gTTS = gTTS
+    return module
+
+@contextmanager
+def install(ddg=None, wikipedia=None, tts=None):
+    """Swap the stubs in for the real clients, restoring them on exit."""
+    ddg, wikipedia, tts = ddg or Upstream(), wikipedia or Upstream(), tts or Upstream()
+    saved_modules = {name: sys.modules.get(name) for name in ('wikipedia', 'gtts')}
+    saved_ddgs = search_service.DDGS
+    sys.modules['wikipedia'] = fake_wikipedia(wikipedia)
+    sys.modules['gtts'] = fake_gtts(tts)
+    search_service.DDGS = fake_ddgs(ddg)
+    try:
+        yield {'duckduckgo': ddg, 'wikipedia': wikipedia, 'gtts': tts}
+    finally:
+        search_service.DDGS = saved_ddgs
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
@@ -0,0 +1,16 @@
+import json
+import os
+import sys
+
+# Allow running as `python backend/build_knowledge_index.py` from the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.core.services.knowledge_service import build_index
+
+print("Loading knowledge base...")
+with open('backend/knowledge.json', 'r') as file:
+    entries = json.load(file)['entries']
+
+print(f"Indexing {len(entries)} entries...")
+build_index(entries, 'backend/knowledge_index')
+
+print("Index Complete! Saved to backend/knowledge_index/")
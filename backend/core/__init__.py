@@ -1,7 +1,9 @@
 from flask import Flask
 from flask_cors import CORS
+from .logging_config import configure_logging
 
 def create_app(frontend_dir):
+    configure_logging()
     app = Flask(__name__, template_folder=frontend_dir, static_folder=frontend_dir)
     CORS(app, resources={r"/*": {"origins": "*"}})
     app.config['JSON_SORT_KEYS'] = False
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.wsgi import WsgiToAsgi
+from .routes import handle_process, handle_process_batch, handle_health, handle_tts
+
+# Search (DDGS, wikipedia) and gTTS only ship blocking clients, so their I/O
+# runs on this pool and is awaited from the event loop. The loop holds the
+# connections; a slow lookup costs one pool thread, not a server worker.
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ECHO_ASGI_WORKERS', 256)),
+    thread_name_prefix='echo-asgi'
+)
+
+async def run_blocking(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_pool, fn, *args)
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def _send_json(send, payload, status):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _blocking_pool.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+def create_asgi_app(flask_app, model, responses_data, conversation_manager, audio_cache):
+    """
+    Wrap the Flask app in an ASGI app. /process, /process_batch, /tts and
+    /health are served
+    natively on the event loop; every other route (static files, audio,
+    /clear) falls through to the regular Flask routes.
+    """
+    wsgi_fallback = WsgiToAsgi(flask_app)
+
+    async def process(data):
+        return await run_blocking(handle_process, data, model, responses_data, conversation_manager)
+
+    async def process_batch(data):
+        return await run_blocking(handle_process_batch, data, model, responses_data, conversation_manager)
+
+    async def tts(data):
+        return await run_blocking(handle_tts, data, audio_cache)
+
+    async def health(data):
+        return handle_health(model, audio_cache, conversation_manager)
+
+    routes = {
+        ('POST', '/process'): process,
+        ('POST', '/process_batch'): process_batch,
+        ('POST', '/tts'): tts,
+        ('GET', '/health'): health
+    }
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await _lifespan(receive, send)
+
+        handler = routes.get((scope.get('method'), scope.get('path')))
+        if handler is None:
+            return await wsgi_fallback(scope, receive, send)
+
+        body = await _read_body(receive)
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return await _send_json(send, {'error': 'Invalid JSON', 'success': False}, 400)
+
+        payload, status = await handler(data)
+        await _send_json(send, payload, status)
+
+    return app
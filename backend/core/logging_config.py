@@ -0,0 +1,33 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+_listener = None
+
+def configure_logging():
+    """
+    Route the 'backend' loggers through a queue: request threads only
+    enqueue records and a single listener thread formats and writes them,
+    so stdout I/O stays off the request path. The level comes from
+    ECHO_LOG_LEVEL (default INFO; per-request routing details are DEBUG).
+    Safe to call more than once.
+    """
+    global _listener
+    logger = logging.getLogger('backend')
+    logger.setLevel(os.environ.get('ECHO_LOG_LEVEL', 'INFO').upper())
+    if _listener is not None:
+        return logger
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    records = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(records))
+    logger.propagate = False
+
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
@@ -1,12 +1,194 @@
+import json
+import logging
 import os
-import uuid
+import queue
 import time
-from flask import render_template, request, jsonify, send_from_directory, send_file
-from gtts import gTTS
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, render_template, request, jsonify, send_from_directory, stream_with_context
 from .services.chat_service import generate_response
+from .services.search_service import get_breaker_stats, get_cache_stats
+from .services.knowledge_service import get_knowledge_stats
+from .services.tts_service import prefetch_speech, stream_speech
+from .services.intent_service import classify_intents, is_exact_pattern
+from .services.metrics_service import registry, request_seconds, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+AUDIO_MAX_AGE = 365 * 24 * 3600
+MAX_BATCH_COMMANDS = 512
+
+# Runs the response pipeline for /process/stream while the request thread
+# writes its progress events
+_stream_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ECHO_STREAM_WORKERS', 32)),
+    thread_name_prefix='echo-stream'
+)
+_DONE = object()
+
+# Request handlers shared by the Flask routes below and the ASGI app in
+# core/asgi.py. Each takes the decoded JSON body and returns (payload, status).
+
+def handle_process(data, model, responses_data, conversation_manager):
+    with request_seconds.time('/process'):
+        try:
+            command = data.get('command', '')
+            session_id = data.get('session_id', 'default')
+
+            # Predict intent and whether it is confident enough to route on
+            with stage_seconds.time('intent'):
+                intent, confidence, confident = classify_intents(model, [command])[0]
+
+            response = generate_response(intent, command, session_id, conversation_manager, responses_data, confident,
+                                         exact=is_exact_pattern(model, command, intent))
+
+            with stage_seconds.time('assembly'):
+                conversation_manager.add_exchange(session_id, command, response, intent)
+                return {
+                    'response': response,
+                    'intent': intent,
+                    'confidence': confidence,
+                    'success': True
+                }, 200
+        except Exception as e:
+            logger.exception("Error in /process: %s", e)
+            return {'error': str(e), 'success': False}, 500
+
+def _event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+def handle_process_stream(data, model, responses_data, conversation_manager, audio_cache):
+    """
+    /process as Server-Sent Events: 'intent' as soon as it is predicted,
+    'status' ({"status": "searching"}) when the reply has to wait for a
+    search backend, then 'answer' with the same payload /process returns,
+    or 'error'. With ``"tts": true`` in the body, synthesis of the
+    answer's first sentence starts before the answer is sent.
+    """
+    command = data.get('command', '')
+    session_id = data.get('session_id', 'default')
+    started = time.perf_counter()
+    try:
+        with stage_seconds.time('intent'):
+            intent, confidence, confident = classify_intents(model, [command])[0]
+    except Exception as e:
+        logger.exception("Error in /process/stream: %s", e)
+        yield _event('error', {'error': str(e), 'success': False})
+        return
+    yield _event('intent', {'intent': intent, 'confidence': confidence})
+
+    events = queue.SimpleQueue()
+
+    def run():
+        try:
+            response = generate_response(intent, command, session_id, conversation_manager, responses_data,
+                                         confident, on_status=lambda status: events.put(('status', {'status': status})),
+                                         exact=is_exact_pattern(model, command, intent))
+            with stage_seconds.time('assembly'):
+                conversation_manager.add_exchange(session_id, command, response, intent)
+            if data.get('tts'):
+                prefetch_speech(audio_cache, response, data.get('lang', 'en'))
+            events.put(('answer', {'response': response, 'intent': intent, 'confidence': confidence, 'success': True}))
+        except Exception as e:
+            logger.exception("Error in /process/stream: %s", e)
+            events.put(('error', {'error': str(e), 'success': False}))
+        finally:
+            request_seconds.observe(time.perf_counter() - started, '/process/stream')
+            events.put(_DONE)
+
+    _stream_pool.submit(run)
+    while True:
+        item = events.get()
+        if item is _DONE:
+            return
+        yield _event(*item)
+
+def handle_process_batch(data, model, responses_data, conversation_manager):
+    with request_seconds.time('/process_batch'):
+        return _process_batch(data, model, responses_data, conversation_manager)
+
+def _process_batch(data, model, responses_data, conversation_manager):
+    try:
+        commands = data.get('commands', [])
+        session_id = data.get('session_id', 'default')
+        if not isinstance(commands, list) or not commands:
+            return {'error': 'No commands', 'success': False}, 400
+        if len(commands) > MAX_BATCH_COMMANDS:
+            return {'error': f'At most {MAX_BATCH_COMMANDS} commands per batch', 'success': False}, 400
+        # Checked up front: a bad element must not leave earlier commands
+        # half-processed in the session history
+        if not all(isinstance(command, str) for command in commands):
+            return {'error': 'Commands must be strings', 'success': False}, 400
+
+        # One vectorized model call for the whole batch
+        with stage_seconds.time('intent'):
+            predictions = classify_intents(model, commands)
+
+        # Responses are generated in order so follow-ups see earlier commands
+        results = []
+        for command, (intent, confidence, confident) in zip(commands, predictions):
+            response = generate_response(intent, command, session_id, conversation_manager, responses_data, confident,
+                                         exact=is_exact_pattern(model, command, intent))
+            conversation_manager.add_exchange(session_id, command, response, intent)
+            results.append({'command': command, 'response': response, 'intent': intent, 'confidence': confidence})
+
+        return {'results': results, 'success': True}, 200
+    except Exception as e:
+        logger.exception("Error in /process_batch: %s", e)
+        return {'error': str(e), 'success': False}, 500
+
+def handle_health(model, audio_cache, conversation_manager):
+    return {
+        'status': 'healthy',
+        'ml_enabled': model is not None and model.ready,
+        'intent_model': model.stats() if model else None,
+        'search_cache': get_cache_stats(),
+        'search_backends': get_breaker_stats(),
+        'knowledge_index': get_knowledge_stats(),
+        'audio_cache': audio_cache.stats(),
+        'sessions': conversation_manager.stats()
+    }, 200
+
+def handle_tts(data, audio_cache):
+    with request_seconds.time('/tts'):
+        try:
+            text = data.get('text', '')
+            if not text: return {'error': 'No text'}, 400
+
+            # Repeated answers reuse the clip synthesized the first time
+            filename = audio_cache.get_or_synthesize(text, data.get('lang', 'en'))
+            return {'success': True, 'audio_url': f'/audio/{filename}'}, 200
+        except Exception as e:
+            logger.exception("Error in /tts: %s", e)
+            return {'error': str(e), 'success': False}, 500
+
+def register_collectors(audio_cache, conversation_manager):
+    # Statistics the caches and stores already keep, read at scrape time
+    registry.collector('echo_search_cache_requests_total', 'Search answer cache lookups.', 'counter',
+                       lambda: {'hit': get_cache_stats()['hits'], 'miss': get_cache_stats()['misses']}, label='result')
+    registry.collector('echo_search_cache_entries', 'Answers held in the search cache.', 'gauge',
+                       lambda: get_cache_stats()['size'])
+    registry.collector('echo_search_coalesced_total', 'Search misses that joined an in-flight request.', 'counter',
+                       lambda: get_cache_stats()['single_flight']['coalesced'])
+    registry.collector('echo_search_circuit_open', 'Search backends whose circuit is open (1) or half-open (0.5).', 'gauge',
+                       lambda: {name: {'closed': 0, 'half_open': 0.5, 'open': 1}[stats['state']]
+                                for name, stats in get_breaker_stats().items()}, label='backend')
+    registry.collector('echo_search_timeout_seconds', 'Current adaptive timeout per search backend.', 'gauge',
+                       lambda: {name: stats['timeout'] for name, stats in get_breaker_stats().items()}, label='backend')
+    registry.collector('echo_knowledge_lookups_total', 'Offline knowledge index lookups.', 'counter',
+                       lambda: {k: v for k, v in get_knowledge_stats().items() if k != 'entries'}, label='result')
+    registry.collector('echo_tts_cache_requests_total', 'Speech clip cache lookups.', 'counter',
+                       lambda: {'hit': audio_cache.stats()['hits'], 'miss': audio_cache.stats()['misses']}, label='result')
+    registry.collector('echo_tts_cache_bytes', 'Bytes of synthesized speech on disk.', 'gauge',
+                       lambda: audio_cache.stats()['bytes'])
+    registry.collector('echo_sessions', 'Live conversation sessions in this process.', 'gauge',
+                       lambda: conversation_manager.stats().get('resident', 0))
+
+def handle_metrics():
+    return registry.render(), 200
+
+def register_routes(app, model, responses_data, conversation_manager, audio_cache, FRONTEND_DIR):
+    register_collectors(audio_cache, conversation_manager)
 
-def register_routes(app, model, responses_data, conversation_manager, TEMP_DIR, FRONTEND_DIR):
-    
     @app.route('/')
     def index():
         return render_template('index.html')
@@ -26,65 +208,67 @@ def register_routes(app, model, responses_data, conversation_manager, TEMP_DIR,
 
     @app.route('/process', methods=['POST'])
     def process():
-        try:
-            data = request.get_json()
-            command = data.get('command', '')
-            session_id = data.get('session_id', 'default')
-            
-            # Predict intent
-            intent = None
-            if model:
-                try:
-                    intent = model.predict([command])[0]
-                except:
-                    pass
-            
-            response = generate_response(intent, command, session_id, conversation_manager, responses_data)
-            
-            conversation_manager.add_message(session_id, 'user', command, intent)
-            conversation_manager.add_message(session_id, 'assistant', response, intent)
-            
-            return jsonify({
-                'response': response,
-                'intent': intent,
-                'success': True
-            })
-        except Exception as e:
-            print(f"Error in /process: {e}")
-            return jsonify({'error': str(e), 'success': False}), 500
+        payload, status = handle_process(request.get_json(), model, responses_data, conversation_manager)
+        return jsonify(payload), status
+
+    @app.route('/process/stream', methods=['POST'])
+    def process_stream():
+        data = request.get_json()
+        if not isinstance(data, dict):
+            # Once the stream starts the status code is already 200
+            return jsonify({'error': 'Invalid request', 'success': False}), 400
+        events = handle_process_stream(data, model, responses_data, conversation_manager, audio_cache)
+        return Response(
+            stream_with_context(events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+        )
+
+    @app.route('/process_batch', methods=['POST'])
+    def process_batch():
+        payload, status = handle_process_batch(request.get_json(), model, responses_data, conversation_manager)
+        return jsonify(payload), status
 
     @app.route('/health', methods=['GET'])
     def health():
-        return jsonify({'status': 'healthy', 'ml_enabled': model is not None})
+        payload, status = handle_health(model, audio_cache, conversation_manager)
+        return jsonify(payload), status
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        body, status = handle_metrics()
+        return Response(body, status=status, mimetype='text/plain; version=0.0.4')
 
     @app.route('/tts', methods=['POST'])
     def tts_generate():
-        try:
-            data = request.get_json()
-            text = data.get('text', '')
-            if not text: return jsonify({'error': 'No text'}), 400
-            
-            filename = f"speech_{uuid.uuid4()}.mp3"
-            filepath = os.path.join(TEMP_DIR, filename)
-            
-            # Cleanup old audio files
-            for f in os.listdir(TEMP_DIR):
-                if os.path.getmtime(os.path.join(TEMP_DIR, f)) < time.time() - 300:
-                    try: os.remove(os.path.join(TEMP_DIR, f))
-                    except: pass
-            
-            tts = gTTS(text=text, lang='en')
-            tts.save(filepath)
-            return jsonify({'success': True, 'audio_url': f'/audio/{filename}'})
-        except Exception as e:
-            print(f"Error in /tts: {e}")
-            return jsonify({'error': str(e), 'success': False}), 500
+        payload, status = handle_tts(request.get_json(), audio_cache)
+        return jsonify(payload), status
+
+    @app.route('/tts/stream', methods=['GET'])
+    def tts_stream():
+        # GET so an <audio> element can play it directly while it downloads
+        text = request.args.get('text', '')
+        if not text: return jsonify({'error': 'No text'}), 400
+        return Response(
+            stream_with_context(stream_speech(audio_cache, text, request.args.get('lang', 'en'))),
+            mimetype='audio/mpeg',
+            headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/audio/<filename>')
     def serve_audio(filename):
-        return send_file(os.path.join(TEMP_DIR, filename))
+        if not filename.endswith('.mp3'):
+            # The directory also holds the cache snapshots
+            return jsonify({'error': 'Not found'}), 404
+        # Clips are content-addressed, so a URL's bytes never change
+        response = send_from_directory(
+            audio_cache.directory, filename,
+            mimetype='audio/mpeg', etag=filename.rsplit('.', 1)[0], max_age=AUDIO_MAX_AGE
+        )
+        response.headers['Cache-Control'] = f'public, max-age={AUDIO_MAX_AGE}, immutable'
+        return response
 
     @app.route('/clear/<session_id>', methods=['POST'])
     def clear_session(session_id):
-        conversation_manager.sessions.pop(session_id, None)
+        conversation_manager.clear_session(session_id)
         return jsonify({'success': True})
@@ -0,0 +1,186 @@
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import Event, Lock
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Guards calls to one upstream backend.
+
+    The outcome and latency of the last ``window`` calls are kept. Once at
+    least ``min_calls`` of them are recorded and the share of failures
+    (errors and timeouts) reaches ``failure_rate``, the circuit opens and
+    calls fail immediately with CircuitOpenError for ``cooldown`` seconds.
+    After that a single probe call is let through (half-open): success
+    closes the circuit, failure opens it for another cooldown.
+
+    Each call gets a timeout of ``timeout_factor`` times the p95 latency of
+    recent calls, kept between ``min_timeout`` and ``max_timeout`` (the
+    latter until enough calls have been seen, and for the recovery probe).
+    A call that timed out counts as taking at least its timeout, so the
+    estimate grows back when a backend slows down.
+
+    Calls run on the breaker's own thread pool so a stuck library call only
+    holds a pool thread; a late result still completes in the background.
+    The timeout starts when the call starts running, not while it waits
+    for a pool thread. A call that is still queued after ``max_timeout``
+    is cancelled and raises TimeoutError without counting against the
+    backend. At most ``max_pending`` calls may be running or queued;
+    further calls are rejected like an open circuit.
+    """
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5, cooldown=30.0,
+                 min_timeout=0.5, max_timeout=5.0, timeout_factor=2.0, max_workers=64, max_pending=256,
+                 clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.clock = clock
+        self.lock = Lock()
+        self._calls = deque(maxlen=window)  # (ok, seconds or None if not a latency sample)
+        self._timeout = max_timeout
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self.opens = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'echo-{name}')
+
+    def admit(self):
+        """
+        CLOSED if a call may go out now, HALF_OPEN if it may go out as the
+        recovery probe (only one at a time), None if it must not.
+        """
+        with self.lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return HALF_OPEN
+            self.rejected += 1
+            return None
+
+    def timeout(self) -> float:
+        return self._timeout
+
+    def record(self, ok, seconds, probe=False, timed_out=False):
+        """
+        Record one call. ``seconds`` is a latency sample for successful
+        calls and, as a lower bound, for timed-out ones; errors have none.
+        """
+        with self.lock:
+            if probe:
+                self._probing = False
+                if ok:
+                    # Latency may have changed while the circuit was open:
+                    # start over from max_timeout, like a new breaker
+                    self.state = CLOSED
+                    self._calls.clear()
+                    self._timeout = self.max_timeout
+                else:
+                    self._open()
+                    return
+            self._calls.append((ok, seconds if ok or timed_out else None))
+
+            latencies = sorted(s for _, s in self._calls if s is not None)
+            if len(latencies) >= self.min_calls:
+                p95 = latencies[math.ceil(0.95 * len(latencies)) - 1]
+                self._timeout = min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_factor))
+
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            if self.state == CLOSED and len(self._calls) >= self.min_calls \
+                    and failures >= self.failure_rate * len(self._calls):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.opens += 1
+
+    def call(self, fn):
+        """
+        Run ``fn()`` under the breaker. Raises CircuitOpenError without
+        calling it while the circuit is open, TimeoutError if it takes longer
+        than the current timeout, or whatever ``fn`` raised.
+        """
+        admitted = self.admit()
+        if admitted is None:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        probe = admitted == HALF_OPEN
+        with self.lock:
+            if self._pending >= self.max_pending:
+                if probe:
+                    self._probing = False
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} has {self._pending} calls pending")
+            self._pending += 1
+        # The probe must not fail just because latency changed while open
+        timeout = self.max_timeout if probe else self.timeout()
+        started = Event()
+        start = []
+
+        def run():
+            start.append(time.perf_counter())
+            started.set()
+            return fn()
+
+        future = self._pool.submit(run)
+        future.add_done_callback(self._finished)
+        if not started.wait(self.max_timeout) and future.cancel():
+            # Every pool thread stayed busy: our saturation, not the backend's
+            with self.lock:
+                if probe:
+                    self._probing = False
+                self.rejected += 1
+            raise TimeoutError(f"{self.name} call waited {self.max_timeout:.2f}s for a thread") from None
+        started.wait()
+        try:
+            result = future.result(timeout=max(0.0, start[0] + timeout - time.perf_counter()))
+        except TimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            self.record(False, timeout, probe, timed_out=True)
+            raise TimeoutError(f"{self.name} did not answer within {timeout:.2f}s") from None
+        except Exception:
+            self.record(False, time.perf_counter() - start[0], probe)
+            raise
+        self.record(True, time.perf_counter() - start[0], probe)
+        return result
+
+    def _finished(self, future):
+        # Runs when the call completes or is cancelled
+        with self.lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+                state = HALF_OPEN
+            else:
+                state = self.state
+            return {
+                'state': state,
+                'timeout': round(self._timeout, 3),
+                'recent_calls': len(self._calls),
+                'recent_failures': sum(1 for ok, _ in self._calls if not ok),
+                'opens': self.opens,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'pending': self._pending
+            }
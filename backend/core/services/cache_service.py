@@ -0,0 +1,181 @@
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+# Sentinel so that a cached ``None`` (e.g. a Wikipedia page miss) can be told
+# apart from "not in the cache".
+MISSING = object()
+
+def normalize_query(text):
+    """
+    Normalize a query into a cache key: lowercase, trimmed, single-spaced.
+    "PM of  India" and "pm of india" should share an entry.
+    """
+    return ' '.join(text.lower().split())
+
+class TTLCache:
+    """
+    Bounded in-memory cache with a TTL per entry and LRU eviction.
+    Safe to share between request threads.
+
+    Expired entries are kept for another ``stale_ttl`` seconds, during
+    which get() misses but get_stale() still returns them, e.g. to answer
+    while the upstream service is down.
+    """
+    def __init__(self, max_entries=1024, default_ttl=3600, stale_ttl=0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def get(self, key, default=MISSING):
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                if expires_at + self.stale_ttl <= now:
+                    del self._data[key]
+                    self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key, default=MISSING):
+        """The entry for ``key`` even if it has expired, as long as it is within ``stale_ttl``."""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] + self.stale_ttl <= time.monotonic():
+                return default
+            self.stale_hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.default_ttl
+        with self.lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def snapshot(self):
+        """
+        Entries as (key, value, seconds to expiry), least recently used
+        first. Expired entries still within ``stale_ttl`` are included with
+        a negative remaining time.
+        """
+        now = time.monotonic()
+        with self.lock:
+            return [(key, value, expires_at - now) for key, (value, expires_at) in self._data.items()
+                    if expires_at + self.stale_ttl > now]
+
+    def restore(self, entries):
+        """
+        Add entries in the format of snapshot(), e.g. saved by an earlier
+        process. They rank as older than anything already cached, keys that
+        are already cached are skipped, and only as many of the most recent
+        ones as fit are kept. Returns the number added.
+        """
+        now = time.monotonic()
+        added = 0
+        with self.lock:
+            for key, value, ttl in reversed(entries):
+                if len(self._data) >= self.max_entries:
+                    break
+                if key in self._data or ttl + self.stale_ttl <= 0:
+                    continue
+                self._data[key] = (value, now + ttl)
+                self._data.move_to_end(key, last=False)
+                added += 1
+        return added
+
+    def clear(self):
+        with self.lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale_hits': self.stale_hits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    function, every other caller with the same key waits for that result
+    (or exception) instead of starting its own upstream request.
+    """
+    def __init__(self):
+        self._calls = {}
+        self.lock = Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
@@ -1,8 +1,31 @@
+import logging
+import os
 import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from threading import Lock
-from .search_service import search_duckduckgo, search_wikipedia
+from .session_store import MemorySessionStore, Message
+from .search_service import search_duckduckgo, search_wikipedia, NO_RESULTS_MESSAGE, CONNECTION_ERROR_MESSAGE
+from .keyword_service import query_features
+from .knowledge_service import lookup_answer
+from .math_service import MathError, LimitExceeded, DivisionByZero, evaluate, extract_expression, format_number, is_expression
+from .metrics_service import routes_total, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# 'serial' tries Wikipedia then DuckDuckGo one after the other.
+# 'race' fires them concurrently and answers within SEARCH_DEADLINE seconds.
+SEARCH_MODE = os.environ.get('ECHO_SEARCH_MODE', 'serial')
+SEARCH_DEADLINE = float(os.environ.get('ECHO_SEARCH_DEADLINE', 1.5))
+SEARCH_TIMEOUT_MESSAGE = "That's taking longer than expected. Please try again in a moment."
+
+SMALL_TALK_INTENTS = ['greeting', 'goodbye', 'thanks', 'about', 'help']
+
+_search_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ECHO_SEARCH_WORKERS', 16)),
+    thread_name_prefix='echo-search'
+)
 
 def predict_intent(text, model):
     if model:
@@ -14,139 +37,290 @@ def predict_intent(text, model):
     return None
 
 class ConversationManager:
-    def __init__(self, max_history=50):
-        self.sessions = {}
-        self.lock = Lock()
-        self.max_history = max_history
-        self.analytics = {}
-    
+    """
+    Per-session chat history and analytics. Storage is delegated to a
+    session store (see session_store.py): in-process memory by default, or a
+    shared SQLite file so every gunicorn worker sees the same sessions.
+    The limits are only used to build the default memory store.
+    """
+    def __init__(self, max_history=50, session_ttl=1800, max_sessions=10000, num_shards=16, store=None):
+        if store is None:
+            store = MemorySessionStore(max_history, session_ttl, max_sessions, num_shards)
+        self.store = store
+
     def get_session(self, session_id: str) -> dict:
-        with self.lock:
-            if session_id not in self.sessions:
-                current_time = datetime.now().isoformat()
-                self.sessions[session_id] = {
-                    'history': [],
-                    'context': {},
-                    'created_at': current_time
-                }
-                self.analytics[session_id] = {
-                    'total_messages': 0,
-                    'commands_used': {},
-                    'session_start': current_time,
-                    'last_active': current_time
-                }
-            else:
-                self.analytics[session_id]['last_active'] = datetime.now().isoformat()
-            return self.sessions[session_id]
-    
+        return self.store.get_session(session_id)
+
+    def get_history(self, session_id: str) -> list:
+        """Snapshot of a session's messages, safe to iterate without the lock."""
+        return self.store.get_history(session_id)
+
     def add_message(self, session_id: str, role: str, message: str, intent = None):
-        session = self.get_session(session_id)
-        session['history'].append({
-            'role': role,
-            'message': message,
-            'timestamp': datetime.now().isoformat(),
-            'intent': intent
-        })
-        self.analytics[session_id]['total_messages'] += 1
-        if intent:
-            if intent not in self.analytics[session_id]['commands_used']:
-                self.analytics[session_id]['commands_used'][intent] = 0
-            self.analytics[session_id]['commands_used'][intent] += 1
+        self.store.add_messages(session_id, [Message(role, message, intent)])
+
+    def add_exchange(self, session_id: str, command: str, response: str, intent = None):
+        """Record a user command and the assistant's reply in a single store write."""
+        self.store.add_messages(session_id, [
+            Message('user', command, intent),
+            Message('assistant', response, intent)
+        ])
+
+    def export_session(self, session_id: str) -> dict:
+        """JSON-ready copy of a session's history and analytics (ISO timestamps)."""
+        return self.store.export_session(session_id)
+
+    def clear_session(self, session_id: str):
+        self.store.clear_session(session_id)
+
+    def stats(self) -> dict:
+        return self.store.stats()
 
 def calculate_math(text):
     try:
-        match = re.search(r'([\d\.\s\+\-\*\/\(\)]+)', text)
-        if match:
-            return f"The result is {eval(match.group(1))}"
-    except:
+        return f"The result is {format_number(evaluate(extract_expression(text)))}"
+    except DivisionByZero:
+        return "I can't divide by zero."
+    except LimitExceeded:
+        return "That number is too large for me to calculate."
+    except MathError:
         pass
     return "I couldn't calculate that."
 
-def generate_response(intent, text, session_id, conversation_manager, responses_data):
+def is_answer(result):
+    return bool(result) and result not in (NO_RESULTS_MESSAGE, CONNECTION_ERROR_MESSAGE)
+
+def _wikipedia_answer(query):
+    summary = search_wikipedia(query)
+    return f"According to Wikipedia: {summary}" if summary else None
+
+def race_search(query, deadline_at, include_wikipedia=False):
+    """
+    Run the search backends concurrently and return the highest-priority
+    answer that is ready by ``deadline_at`` (a time.monotonic() value).
+    Wikipedia outranks DuckDuckGo. Returns DuckDuckGo's "no results" or
+    "trouble connecting" message if nothing better finished, or None if no
+    backend finished in time. Late results are ignored (they still fill the
+    answer cache for the next request).
+
+    cancel() only stops backends that have not started yet: a backend still
+    running at the deadline keeps its _search_pool thread until its own
+    timeout (see breaker_service.py) ends it. ECHO_SEARCH_WORKERS should
+    allow for two threads per concurrent search plus these stragglers.
+    """
+    backends = [_wikipedia_answer, search_duckduckgo] if include_wikipedia else [search_duckduckgo]
+    futures = [_search_pool.submit(backend, query) for backend in backends]
+    try:
+        pending = set(futures)
+        while True:
+            # Walk the backends in priority order; stop at the first one
+            # still running since a higher-priority answer may yet arrive.
+            for future in futures:
+                if not future.done():
+                    break
+                result = future.exception() is None and future.result()
+                if is_answer(result):
+                    return result
+            else:
+                break
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0 or not pending:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+        # Deadline reached: take the best answer that did finish
+        for future in futures:
+            if future.done() and future.exception() is None and is_answer(future.result()):
+                return future.result()
+        last = futures[-1]
+        if last.done() and last.exception() is None:
+            return last.result()
+        logger.warning("Search deadline exceeded for: '%s'", query)
+        return None
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _routed(route, reply):
+    routes_total.inc(route)
+    return reply
+
+def _knowledge_answer(query):
+    with stage_seconds.time('knowledge'):
+        answer = lookup_answer(query)
+    if answer:
+        logger.debug("Knowledge index hit for: '%s'", query)
+    return answer
+
+def _web_search(query, deadline_at, consult_index=True, on_status=None, raced=None):
+    if raced:
+        # DuckDuckGo already ran in the identity race and used up the
+        # deadline; searching again would only time out
+        return _routed('search', raced)
+    answer = consult_index and _knowledge_answer(query)
+    if answer:
+        return _routed('knowledge', answer)
+    if on_status:
+        on_status('searching')
+    if SEARCH_MODE == 'race':
+        with stage_seconds.time('race'):
+            answer = race_search(query, deadline_at)
+        return _routed('search', answer or SEARCH_TIMEOUT_MESSAGE)
+    return _routed('search', search_duckduckgo(query))
+
+def _local_reply(intent, responses_data):
+    # Answers that never need the network
+    if intent == 'time':
+        return f"It is {datetime.now().strftime('%I:%M %p')}."
+    elif intent == 'date':
+        return f"Today is {datetime.now().strftime('%A, %B %d, %Y')}."
+    elif intent in SMALL_TALK_INTENTS and intent in responses_data:
+        return random.choice(responses_data[intent])
+    return None
+
+def _once(callback):
+    called = []
+
+    def wrapper(*args):
+        if not called:
+            called.append(True)
+            callback(*args)
+    return wrapper
+
+def _is_small_talk(features):
+    # A greeting phrased as a question ("how are you", "how is it going"),
+    # or 1-2 words with no info/question indicators. This prevents
+    # "pm of india" (3 words) from being a greeting.
+    return features.greeting_phrase or (not features.question and not features.info and features.words < 3)
+
+def generate_response(intent, text, session_id, conversation_manager, responses_data, confident=None, on_status=None,
+                      exact=False):
+    """
+    Reply to ``text``. ``on_status`` is called with 'searching' just before
+    the reply starts waiting on a remote search backend, at most once even
+    if an identity lookup falls through to a web search. ``exact`` says
+    ``text`` is one of the training patterns for ``intent`` (see
+    intent_service.is_exact_pattern).
+    """
+    deadline_at = time.monotonic() + SEARCH_DEADLINE
+    if on_status:
+        on_status = _once(on_status)
+
+    # All keyword rules (see keyword_service.py) are evaluated in one pass
+    features = query_features(text)
+    word_count = features.words
+
+    # Confidence gating (see IntentClassifier): a label below its learned
+    # threshold is treated as unknown, so it can neither force a canned reply
+    # nor block a follow-up merge. None means no confidence information.
+    if confident is False:
+        # ...unless the wording itself is an unmistakable greeting
+        intent = 'greeting' if features.greeting_phrase else None
+
+    # Pure arithmetic ("what is 5 times 3") is answered locally, before it
+    # can be merged with earlier context or sent to a search backend
+    if is_expression(text):
+        logger.debug("Arithmetic detected: '%s'", text)
+        with stage_seconds.time('math'):
+            return _routed('math', calculate_math(text))
+
     # 0. Context Refinement for Follow-up Questions
     refined_text = text
-    text_lower = text.lower()
     
-    is_short = len(text.split()) < 5
-    is_connector = text_lower.startswith(("in ", "at ", "for ", "with ", "about ", "on ", "and "))
+    is_short = word_count < 5
+    is_connector = features.connector
+    is_joke_request = features.joke
     
     # Bug Fix: Skip context merging if the query is a simple greeting or small talk
-    small_talk_intents = ['greeting', 'goodbye', 'thanks', 'about', 'help']
-    is_small_talk = intent in small_talk_intents or text_lower in ["hi", "hello", "hey", "hey there"]
+    is_small_talk = intent in SMALL_TALK_INTENTS or features.short_greeting
     
     if (is_short or is_connector) and not is_small_talk:
+        context_started = time.perf_counter()
         try:
-            session = conversation_manager.get_session(session_id)
-            history = session.get('history', [])
+            history = conversation_manager.get_history(session_id)
             
             last_user_msg = None
             for msg in reversed(history):
-                if msg['role'] == 'user':
-                    last_user_msg = msg['message']
+                if msg.role == 'user':
+                    last_user_msg = msg.message
                     break
             
             if last_user_msg:
-                print(f"Context found. Merging '{last_user_msg}' with '{text}'")
                 refined_text = f"{last_user_msg} {text}"
-                print(f"Refined Query: {refined_text}")
-                text_lower = refined_text.lower()
+                logger.debug("Context found. Merged '%s' with '%s'", last_user_msg, text)
+                features = query_features(refined_text)
         except Exception as e:
-            print(f"Error in context refinement: {e}")
+            logger.error("Error in context refinement: %s", e)
+        stage_seconds.observe(time.perf_counter() - context_started, 'context')
+
+    # Informational Keywords: Phrases that strongly imply a lookup is needed
+    has_info_keyword = features.info
+
+    # Confident local intents ("can you help me", "what is the date today")
+    # are answered right away instead of paying for a lookup first. Small
+    # talk only qualifies under the step-3 rule below, so "thanks, how far
+    # is jupiter" is still searched, or as an exact training pattern
+    # ("can you help me").
+    if confident and not has_info_keyword and (intent not in SMALL_TALK_INTENTS or exact or _is_small_talk(features)):
+        reply = _local_reply(intent, responses_data)
+        if reply:
+            logger.debug("Confident local intent: '%s' -> skipping search", intent)
+            return _routed('local', reply)
 
     # 1. High Priority Logic (Identity/Definitions) using Wikipedia
-    if any(text_lower.startswith(p) for p in ["who is", "what is", "tell me about", "define"]):
-        print(f"Identity question detected: '{refined_text}' -> Trying Wikipedia")
-        wiki_res = search_wikipedia(refined_text)
-        if wiki_res:
-            return f"According to Wikipedia: {wiki_res}"
+    raced = None
+    if features.identity:
+        answer = _knowledge_answer(refined_text)
+        if answer:
+            return _routed('knowledge', answer)
+        if on_status:
+            on_status('searching')
+        if SEARCH_MODE == 'race':
+            logger.debug("Identity question detected: '%s' -> Racing Wikipedia and DuckDuckGo", refined_text)
+            with stage_seconds.time('race'):
+                answer = race_search(refined_text, deadline_at, include_wikipedia=True)
+            if is_answer(answer):
+                return _routed('identity', answer)
+            raced = answer or SEARCH_TIMEOUT_MESSAGE
+        else:
+            logger.debug("Identity question detected: '%s' -> Trying Wikipedia", refined_text)
+            wiki_res = search_wikipedia(refined_text)
+            if wiki_res:
+                return _routed('identity', f"According to Wikipedia: {wiki_res}")
 
     # 2. Dynamic Handlers (Time, Date, Jokes)
-    if intent == 'time':
-        return f"It is {datetime.now().strftime('%I:%M %p')}."
-    elif intent == 'date':
-        return f"Today is {datetime.now().strftime('%A, %B %d, %Y')}."
-    elif intent == 'jokes' and ('joke' in text.lower() or 'laugh' in text.lower()):
-        return random.choice(responses_data[intent])
+    if intent in ('time', 'date'):
+        return _routed('local', _local_reply(intent, responses_data))
+    elif intent == 'jokes' and is_joke_request:
+        return _routed('joke', random.choice(responses_data[intent]))
 
     # 3. Small Talk (Greetings, etc.) - REFINED PRIORITY
     # We only return early if it's a CLEAR small talk intent WITHOUT question indicators,
     # or if it's a known short greeting Phrase.
-    small_talk_intents = ['greeting', 'goodbye', 'thanks', 'about', 'help']
-    question_words = ['who', 'what', 'where', 'when', 'why', 'how', 'is', 'can', 'does', 'do', 'search', 'tell me']
-    
-    # Informational Keywords: Phrases that strongly imply a lookup is needed
-    info_keywords = ['pm', 'prime minister', 'president', 'capital', 'population', 'weather', 'news', 'meaning', 'definition', 'price', 'stock', 'birth', 'death', 'distance', 'highest', 'largest', 'smallest']
+    has_question_word = features.question
     
-    has_question_word = any(word in text_lower.split() for word in question_words)
-    has_info_keyword = any(word in text_lower for word in info_keywords)
-    
-    # Exception: "How are you" and "How is it going" are greetings despite having "how"
-    is_greeting_phrase = any(p in text_lower for p in ["how are you", "how's it going", "how is it going", "what's up"])
-    
-    if intent in small_talk_intents and intent in responses_data:
-        # If it's a greeting phrased as a question (like "how are you"), handle as small talk.
-        # Otherwise, if it has 1-2 words and NO info/question indicators, handle as small talk.
-        # This prevents "pm of india" (3 words) from being a greeting.
-        if is_greeting_phrase or (not has_question_word and not has_info_keyword and len(text.split()) < 3):
-            print(f"Small talk detected: '{intent}' -> returning mapped response")
-            return random.choice(responses_data[intent])
+    if intent in SMALL_TALK_INTENTS and intent in responses_data:
+        if _is_small_talk(features):
+            logger.debug("Small talk detected: '%s' -> returning mapped response", intent)
+            return _routed('small_talk', random.choice(responses_data[intent]))
 
     # 4. Universal Search Trigger
     if has_question_word or has_info_keyword or is_connector:
-        print(f"Informational query detected: '{refined_text}' -> Triggering Search")
-        return search_duckduckgo(refined_text)
+        logger.debug("Informational query detected: '%s' -> Triggering Search", refined_text)
+        return _web_search(refined_text, deadline_at, not features.identity, on_status, raced)
 
     # 5. Regex Logic (Math)
     if 'calculate' in text or re.search(r'\d+\s*[\+\-\*\/]', text):
-        return calculate_math(text)
+        with stage_seconds.time('math'):
+            return _routed('math', calculate_math(text))
     
     # 6. Final Fallback
     # If it's > 2 words and hasn't been handled, it's likely a query of some kind.
-    if len(text.split()) > 2:
-        return search_duckduckgo(refined_text)
+    if word_count > 2:
+        return _web_search(refined_text, deadline_at, not features.identity, on_status, raced)
     
     # Otherwise fallback to a default response from ML if available
     if intent in responses_data:
-        return random.choice(responses_data[intent])
+        return _routed('fallback', random.choice(responses_data[intent]))
 
-    return "I'm not sure how to respond to that. Could you try rephrasing?"
+    return _routed('unknown', "I'm not sure how to respond to that. Could you try rephrasing?")
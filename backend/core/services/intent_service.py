@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import queue
+import re
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Wraps the intent model and gathers concurrent single-text predictions
+    into one vectorized ``model.predict_proba`` call: everything that queued up
+    while the previous batch ran, plus anything arriving within
+    ``max_wait`` seconds. The TF-IDF + LogisticRegression pipeline has a
+    high fixed cost per call, so one call for 32 texts costs about the same
+    as one call for a single text.
+
+    Exposes the same ``predict`` / ``predict_proba`` signatures as the model,
+    so it can be passed anywhere the model is used.
+    """
+    def __init__(self, model, max_batch=64, max_wait=0.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self.lock = Lock()
+        self.batches = 0
+        self.items = 0
+        self._worker = Thread(target=self._run, name='echo-intent-batcher', daemon=True)
+        self._worker.start()
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def predict_proba(self, texts):
+        texts = list(texts)
+        if len(texts) != 1:
+            # Already a batch: no point waiting for company
+            return self.model.predict_proba(texts)
+        future = Future()
+        self._queue.put((texts[0], future))
+        return np.array([future.result()])
+
+    def predict(self, texts):
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                rows = self.model.predict_proba(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), row in zip(batch, rows):
+                future.set_result(row)
+            with self.lock:
+                self.batches += 1
+                self.items += len(batch)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch': round(self.items / self.batches, 2) if self.batches else 0.0
+            }
+
+_PATTERN_CHARS = re.compile(r"[^a-z0-9' ]+")
+
+def pattern_key(text):
+    """Lookup key for the exact-pattern table: lowercase, no punctuation, single-spaced."""
+    return ' '.join(_PATTERN_CHARS.sub(' ', text.lower()).split())
+
+class IntentClassifier:
+    """
+    Serve-time intent model plus the per-intent confidence thresholds learned
+    by train_model.py. classify() reports whether each label is confident
+    enough to route on; intents without a threshold are never confident.
+
+    The model can be supplied later through ``loader`` (see load() and
+    load_in_background()). Until it is ready, queries that are exactly one
+    of the training patterns get that pattern's intent from ``patterns``, a
+    plain dict lookup, and everything else is unlabelled. With
+    ``load_on_demand`` the first query that is not a pattern loads the model.
+    """
+    def __init__(self, model=None, thresholds=None, patterns=None, loader=None, load_on_demand=False):
+        self.model = model
+        self.thresholds = thresholds or {}
+        self.patterns = patterns or {}
+        self.loader = loader
+        self.load_on_demand = load_on_demand
+        self.load_seconds = None
+        self._load_lock = Lock()
+
+    @classmethod
+    def load_thresholds(cls, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def load(self):
+        """Run the loader once (thread-safe) and return the model, or None if loading failed."""
+        if self.model is not None or self.loader is None:
+            return self.model
+        with self._load_lock:
+            if self.model is None and self.loader is not None:
+                start = time.perf_counter()
+                try:
+                    self.model = self.loader()
+                except Exception as e:
+                    logger.error("Error loading model: %s", e)
+                self.load_seconds = round(time.perf_counter() - start, 4)
+                self.loader = None
+        return self.model
+
+    def load_in_background(self):
+        Thread(target=self.load, name='echo-model-loader', daemon=True).start()
+
+    def predict(self, texts):
+        return self.model.predict(texts)
+
+    def classify(self, texts):
+        """Return (intent, confidence, confident) for each text."""
+        model = self.model
+        if model is None:
+            results = [self._match_pattern(text) for text in texts]
+            if not self.load_on_demand or all(intent for intent, _, _ in results):
+                return results
+            model = self.load()
+            if model is None:
+                return results
+
+        probs = model.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        results = []
+        for label, confidence in zip(model.classes_[best], probs[np.arange(len(best)), best]):
+            intent = str(label)
+            threshold = self.thresholds.get(intent)
+            results.append((intent, float(confidence), bool(threshold is not None and confidence >= threshold)))
+        return results
+
+    def _match_pattern(self, text):
+        intent = self.patterns.get(pattern_key(text))
+        return (intent, 1.0, True) if intent else (None, None, None)
+
+    def stats(self) -> dict:
+        return {
+            'model': type(self.model).__name__ if self.model is not None else None,
+            'ready': self.ready,
+            'load_seconds': self.load_seconds,
+            'thresholds': len(self.thresholds),
+            'patterns': len(self.patterns),
+            'batching': self.model.stats() if isinstance(self.model, MicroBatcher) else None
+        }
+
+def classify_intents(model, texts):
+    """(intent, confidence, confident) for many texts in one model call; (None, None, None) without a model."""
+    if not texts:
+        return []
+    if model:
+        try:
+            return model.classify(texts)
+        except Exception as e:
+            logger.error("Error predicting intents: %s", e)
+    return [(None, None, None)] * len(texts)
+
+def is_exact_pattern(model, text, intent):
+    """True if ``text`` is one of the training patterns labelled ``intent`` (see IntentClassifier.patterns)."""
+    return bool(model) and intent is not None and model.patterns.get(pattern_key(text)) == intent
+
+def export_scorer(model, path):
+    """
+    Export the TF-IDF + LogisticRegression pipeline as plain NumPy arrays
+    for FastIntentScorer: vocabulary (ordered by feature row), IDF vector,
+    dense coefficient matrix (features x classes), intercepts and labels.
+    """
+    tfidf = model.named_steps['tfidf']
+    clf = model.named_steps['clf']
+    params = tfidf.get_params()
+    # FastIntentScorer reimplements only this configuration
+    if (params['analyzer'] != 'word' or params['ngram_range'] != (1, 1) or params['sublinear_tf']
+            or params['binary'] or params['norm'] != 'l2' or params['strip_accents'] is not None
+            or params['tokenizer'] is not None or params['preprocessor'] is not None or len(clf.classes_) < 3):
+        raise ValueError("Unsupported pipeline configuration for FastIntentScorer")
+
+    terms = np.empty(len(tfidf.vocabulary_), dtype=object)
+    for term, row in tfidf.vocabulary_.items():
+        terms[row] = term
+    np.savez(
+        path,
+        terms=terms.astype(str),
+        idf=tfidf.idf_,
+        weights=np.ascontiguousarray(clf.coef_.T),
+        intercept=clf.intercept_,
+        classes=clf.classes_.astype(str),
+        token_pattern=np.array(params['token_pattern']),
+        lowercase=np.array(params['lowercase'])
+    )
+
+class FastIntentScorer:
+    """
+    Pure-NumPy replacement for the sklearn intent pipeline at serve time,
+    loaded from the arrays written by export_scorer(). Produces the same
+    labels and probabilities as ``model.predict`` / ``model.predict_proba``:
+    tokens outside the vocabulary (stop words included) are simply skipped,
+    so only the handful of known terms in a query are ever touched.
+    """
+    def __init__(self, terms, idf, weights, intercept, classes, token_pattern, lowercase=True):
+        self.vocabulary = {term: row for row, term in enumerate(terms)}
+        self.idf = idf
+        self.weights = weights
+        self.intercept = intercept
+        self.classes_ = classes
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                [str(t) for t in data['terms']], data['idf'], data['weights'],
+                data['intercept'], data['classes'], str(data['token_pattern']), bool(data['lowercase'])
+            )
+
+    def decision_function(self, texts):
+        scores = np.tile(self.intercept, (len(texts), 1))
+        for i, text in enumerate(texts):
+            if self.lowercase:
+                text = text.lower()
+            counts = {}
+            for token in self.token_re.findall(text):
+                row = self.vocabulary.get(token)
+                if row is not None:
+                    counts[row] = counts.get(row, 0) + 1
+            if not counts:
+                continue
+            rows = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[rows]
+            values /= np.sqrt(values @ values)
+            scores[i] += values @ self.weights[rows]
+        return scores
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts):
+        return self.classes_[self.decision_function(texts).argmax(axis=1)]
+
+def learn_thresholds(model, sentences, labels, target_precision=0.8, n_splits=4, margin=0.05, random_state=42):
+    """
+    Per-intent confidence thresholds for routing, learned on held-out data.
+    Every training sentence is scored once by a copy of ``model`` fit on
+    the other folds; an intent's threshold is the lowest held-out confidence
+    at which its predictions reach ``target_precision``.
+
+    The floor is the fitted model's confidence for an empty query, i.e. the
+    score every out-of-vocabulary question gets. Intents without enough
+    held-out evidence use floor + ``margin``, and no threshold goes below
+    the floor.
+    """
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    labels = np.asarray(labels)
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    probs = cross_val_predict(clone(model), sentences, labels, cv=folds, method='predict_proba')
+    classes = np.unique(labels)
+    predicted = classes[probs.argmax(axis=1)]
+    confidence = probs.max(axis=1)
+
+    floor = dict(zip(model.classes_, model.predict_proba([''])[0]))
+    thresholds = {}
+    for intent in model.classes_:
+        threshold = float(floor[intent]) + margin
+        for candidate in np.sort(confidence[predicted == intent]):
+            selected = (predicted == intent) & (confidence >= candidate)
+            if np.mean(labels[selected] == intent) >= target_precision:
+                threshold = max(float(candidate), float(floor[intent]) + 0.01)
+                break
+        thresholds[str(intent)] = round(threshold, 4)
+    return thresholds
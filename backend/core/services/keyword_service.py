@@ -0,0 +1,142 @@
+import re
+
+# Routing vocabulary for generate_response. Literals match as substrings of
+# the lowercased query (so 'pm' also fires inside "5pm"); prefixes only at
+# the very start; question words only as whole whitespace-separated tokens.
+INFO_KEYWORDS = ['pm', 'prime minister', 'president', 'capital', 'population', 'weather', 'news', 'meaning', 'definition', 'price', 'stock', 'birth', 'death', 'distance', 'highest', 'largest', 'smallest']
+TIME_SENSITIVE_WORDS = ['latest', 'current', 'news', 'today', 'now', 'price', 'stock']
+GREETING_PHRASES = ["how are you", "how's it going", "how is it going", "what's up"]
+JOKE_WORDS = ['joke', 'laugh']
+IDENTITY_PREFIXES = ["who is", "what is", "tell me about", "define"]
+CONNECTOR_PREFIXES = ["in ", "at ", "for ", "with ", "about ", "on ", "and "]
+QUESTION_WORDS = frozenset(['who', 'what', 'where', 'when', 'why', 'how', 'is', 'can', 'does', 'do', 'search'])
+SHORT_GREETINGS = frozenset(["hi", "hello", "hey", "hey there"])
+
+INFO = 1
+TIME_SENSITIVE = 2
+GREETING_PHRASE = 4
+JOKE = 8
+IDENTITY = 16
+CONNECTOR = 32
+
+class QueryFeatures:
+    """Everything the routing rules need to know about one query."""
+    __slots__ = ('flags', 'words', 'question', 'short_greeting')
+
+    def __init__(self, flags, words, question, short_greeting):
+        self.flags = flags
+        self.words = words
+        self.question = question
+        self.short_greeting = short_greeting
+
+    @property
+    def info(self):
+        return bool(self.flags & INFO)
+
+    @property
+    def time_sensitive(self):
+        return bool(self.flags & TIME_SENSITIVE)
+
+    @property
+    def greeting_phrase(self):
+        return bool(self.flags & GREETING_PHRASE)
+
+    @property
+    def joke(self):
+        return bool(self.flags & JOKE)
+
+    @property
+    def identity(self):
+        return bool(self.flags & IDENTITY)
+
+    @property
+    def connector(self):
+        return bool(self.flags & CONNECTOR)
+
+class KeywordMatcher:
+    """
+    All keyword rules compiled once into two regexes built from a trie of
+    the literals: one scanned over the query with a lookahead at every
+    position (so overlapping literals are all seen) and one anchored at the
+    start for the prefix rules. Shared prefixes are factored out, so the
+    regex engine walks each position once instead of once per literal.
+
+    The trie match is greedy and reports only the longest literal at each
+    position, so each literal's flags include those of every shorter rule
+    literal it starts with.
+    """
+    def __init__(self, anywhere, at_start):
+        # literal -> flags, for substring rules and start-of-query rules
+        self._anywhere = _closure(anywhere)
+        self._at_start = _closure(at_start)
+        first = ''.join(sorted(set(re.escape(lit[0]) for lit in anywhere)))
+        self._scan = re.compile(f"(?=[{first}])(?=({_trie_regex(anywhere)}))")
+        self._prefix = re.compile(_trie_regex(at_start))
+
+    def flags(self, text_lower):
+        flags = 0
+        for literal in self._scan.findall(text_lower):
+            flags |= self._anywhere[literal]
+        m = self._prefix.match(text_lower)
+        if m:
+            flags |= self._at_start[m.group()]
+        return flags
+
+    def match(self, text):
+        text_lower = text.lower()
+        tokens = text_lower.split()
+        return QueryFeatures(
+            self.flags(text_lower),
+            len(tokens),
+            not QUESTION_WORDS.isdisjoint(tokens),
+            text_lower in SHORT_GREETINGS
+        )
+
+def _closure(rules):
+    closed = {}
+    for literal in rules:
+        flags = 0
+        for other, other_flags in rules.items():
+            if literal.startswith(other):
+                flags |= other_flags
+        closed[literal] = flags
+    return closed
+
+def _trie_regex(literals):
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return _node_regex(trie)
+
+def _node_regex(node):
+    branches = [re.escape(ch) + _node_regex(child) for ch, child in sorted(node.items()) if ch]
+    if '' in node:
+        # A literal ends here; longer ones may continue
+        return f"(?:{'|'.join(branches)})?" if branches else ''
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+def _rules(*groups):
+    rules = {}
+    for literals, flag in groups:
+        for literal in literals:
+            rules[literal] = rules.get(literal, 0) | flag
+    return rules
+
+matcher = KeywordMatcher(
+    anywhere=_rules(
+        (INFO_KEYWORDS, INFO),
+        (TIME_SENSITIVE_WORDS, TIME_SENSITIVE),
+        (GREETING_PHRASES, GREETING_PHRASE),
+        (JOKE_WORDS, JOKE)
+    ),
+    at_start=_rules(
+        (IDENTITY_PREFIXES, IDENTITY),
+        (CONNECTOR_PREFIXES, CONNECTOR)
+    )
+)
+
+def query_features(text):
+    return matcher.match(text)
@@ -0,0 +1,197 @@
+import json
+import logging
+import math
+import os
+import re
+from threading import Lock
+import numpy as np
+from .search_service import is_time_sensitive
+
+logger = logging.getLogger(__name__)
+
+# Offline answers for evergreen questions. build_knowledge_index.py turns
+# backend/knowledge.json into a directory of .npy arrays that are
+# memory-mapped here, so the index costs no parse time at startup and its
+# pages are shared by every worker process on the host.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_DIR = os.environ.get('ECHO_KNOWLEDGE_INDEX', os.path.join(BACKEND_DIR, 'knowledge_index'))
+
+# An answer is used only if its BM25 score reaches MIN_SCORE and the query
+# and the matched title/alias cover at least MIN_COVERAGE of each other's
+# terms (weighted by IDF, so a missing rare word such as "population" rules
+# a match out, and "in India" does not match "capital of India").
+MIN_SCORE = float(os.environ.get('ECHO_KNOWLEDGE_MIN_SCORE', 2.0))
+MIN_COVERAGE = float(os.environ.get('ECHO_KNOWLEDGE_MIN_COVERAGE', 0.85))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an the of in on at to for from by with and or is are was were be been it its this that these those
+what whats who whos whom which where when why how do does did can could would will you your me my i
+tell about define definition meaning explain please know give say search find s
+""".split())
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+def build_index(entries, directory, k1=1.2, b=0.75):
+    """
+    Write a BM25 index in which the title and each alias of an entry is its
+    own short document pointing at the entry's answer. Postings are stored
+    per term (CSR layout) with their BM25 weight precomputed, so a query is
+    one gather and one sum over the postings of its terms.
+    """
+    docs, doc_entries = [], []
+    for entry_id, entry in enumerate(entries):
+        for field in [entry['title']] + entry.get('aliases', []):
+            terms = tokenize(field)
+            if terms:
+                docs.append(terms)
+                doc_entries.append(entry_id)
+    lengths = np.array([len(doc) for doc in docs], dtype=np.float64)
+    avg_length = lengths.mean() if len(docs) else 0.0
+
+    postings = {}
+    for doc_id, doc in enumerate(docs):
+        counts = {}
+        for term in doc:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    doc_ids, weights, idf = [], [], np.empty(len(terms), dtype=np.float32)
+    doc_idf = np.zeros(len(docs), dtype=np.float32)
+    for row, term in enumerate(terms):
+        df = len(postings[term])
+        idf[row] = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for doc_id, tf in postings[term]:
+            norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+            doc_ids.append(doc_id)
+            weights.append(idf[row] * tf * (k1 + 1) / (tf + norm))
+            doc_idf[doc_id] += idf[row]
+        offsets[row + 1] = len(doc_ids)
+
+    answers = [entry['answer'].encode('utf-8') for entry in entries]
+    answer_offsets = np.zeros(len(answers) + 1, dtype=np.int64)
+    answer_offsets[1:] = np.cumsum([len(a) for a in answers])
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'terms.npy'), np.array(terms, dtype=str))
+    np.save(os.path.join(directory, 'idf.npy'), idf)
+    np.save(os.path.join(directory, 'offsets.npy'), offsets)
+    np.save(os.path.join(directory, 'doc_ids.npy'), np.array(doc_ids, dtype=np.int32))
+    np.save(os.path.join(directory, 'weights.npy'), np.array(weights, dtype=np.float32))
+    np.save(os.path.join(directory, 'doc_idf.npy'), doc_idf)
+    np.save(os.path.join(directory, 'doc_entries.npy'), np.array(doc_entries, dtype=np.int32))
+    np.save(os.path.join(directory, 'answer_offsets.npy'), answer_offsets)
+    np.save(os.path.join(directory, 'answers.npy'), np.frombuffer(b''.join(answers), dtype=np.uint8))
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'entries': len(entries), 'documents': len(docs), 'terms': len(terms), 'k1': k1, 'b': b}, f, indent=2)
+        f.write('\n')
+
+class KnowledgeIndex:
+    """BM25 index written by build_index(), memory-mapped read-only."""
+    def __init__(self, directory):
+        def array(name):
+            return np.load(os.path.join(directory, name), mmap_mode='r')
+
+        self.directory = directory
+        self.terms = array('terms.npy')
+        self.idf = array('idf.npy')
+        self.offsets = array('offsets.npy')
+        self.doc_ids = array('doc_ids.npy')
+        self.weights = array('weights.npy')
+        self.doc_idf = array('doc_idf.npy')
+        self.doc_entries = array('doc_entries.npy')
+        self.answer_offsets = array('answer_offsets.npy')
+        self.answers = array('answers.npy')
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+    def _rows(self, query):
+        rows = []
+        for term in set(tokenize(query)):
+            row = int(np.searchsorted(self.terms, term))
+            rows.append(row if row < len(self.terms) and self.terms[row] == term else -1)
+        return rows
+
+    def search(self, query, min_coverage=0.0):
+        """
+        Best entry for ``query`` as (answer, score, coverage), or None.
+        Coverage is the smaller of the share of the query matched by the
+        document and the share of the document matched by the query, both
+        weighted by IDF; only documents reaching ``min_coverage`` compete.
+        """
+        rows = self._rows(query)
+        known = [row for row in rows if row >= 0]
+        if not known:
+            return None
+
+        # Unknown terms count as the rarest possible word
+        unknown_idf = math.log(1 + (self.meta['documents'] - 0.5) / 1.5)
+        query_idf = sum(float(self.idf[row]) for row in known) + unknown_idf * (len(rows) - len(known))
+
+        spans = [(int(self.offsets[row]), int(self.offsets[row + 1])) for row in known]
+        docs = np.concatenate([self.doc_ids[start:end] for start, end in spans])
+        weights = np.concatenate([self.weights[start:end] for start, end in spans])
+        term_idf = np.concatenate([np.full(end - start, self.idf[row]) for row, (start, end) in zip(known, spans)])
+
+        candidates, slots = np.unique(docs, return_inverse=True)
+        scores = np.bincount(slots, weights=weights)
+        matched_idf = np.bincount(slots, weights=term_idf)
+        coverage = np.minimum(matched_idf / query_idf, matched_idf / self.doc_idf[candidates])
+        scores[coverage < min_coverage] = -1.0
+        best = int(scores.argmax())
+        if scores[best] < 0:
+            return None
+
+        entry = int(self.doc_entries[candidates[best]])
+        start, end = int(self.answer_offsets[entry]), int(self.answer_offsets[entry + 1])
+        answer = self.answers[start:end].tobytes().decode('utf-8')
+        return answer, float(scores[best]), float(coverage[best])
+
+_index = None
+_index_lock = Lock()
+_stats = {'hits': 0, 'misses': 0, 'skipped': 0}
+_stats_lock = Lock()
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+def get_index():
+    """The shared index, loaded on first use; None if it has not been built."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not os.path.exists(os.path.join(INDEX_DIR, 'meta.json')):
+                    return None
+                _index = KnowledgeIndex(INDEX_DIR)
+    return _index
+
+def lookup_answer(query):
+    """Local answer for an evergreen question, or None to fall through to search."""
+    index = get_index()
+    if index is None:
+        return None
+    if is_time_sensitive(query):
+        # "latest", "now", "price"... always go to the live backends
+        _count('skipped')
+        return None
+    try:
+        match = index.search(query, MIN_COVERAGE)
+    except Exception as e:
+        logger.error("Error searching knowledge index: %s", e)
+        return None
+    if match and match[1] >= MIN_SCORE:
+        _count('hits')
+        return match[0]
+    _count('misses')
+    return None
+
+def get_knowledge_stats() -> dict:
+    index = get_index()
+    with _stats_lock:
+        return dict(_stats, entries=index.meta['entries'] if index else 0)
@@ -0,0 +1,272 @@
+import math
+import re
+
+# Hard limits: every expression is evaluated in bounded time and memory
+MAX_EXPRESSION_LENGTH = 256
+MAX_TOKENS = 128
+MAX_DEPTH = 32        # nested parentheses / unary operators
+MAX_STEPS = 256       # operator applications
+MAX_MAGNITUDE = 1e15  # largest operand or intermediate result
+MAX_EXPONENT = 64
+
+class MathError(ValueError):
+    """Raised for expressions that are malformed or exceed a limit."""
+
+class LimitExceeded(MathError):
+    pass
+
+class DivisionByZero(MathError):
+    pass
+
+# Spoken forms -> symbols, applied in one regex pass (longest phrases first)
+_SPOKEN = {
+    'square root of': ' sqrt ',
+    'root of': ' sqrt ',
+    'to the power of': ' ^ ',
+    'raised to the power of': ' ^ ',
+    'raised to': ' ^ ',
+    'squared': ' ^ 2 ',
+    'cubed': ' ^ 3 ',
+    'multiplied by': ' * ',
+    'times': ' * ',
+    'divided by': ' / ',
+    'over': ' / ',
+    'plus': ' + ',
+    'minus': ' - ',
+    'modulo': ' mod ',
+    'percent of': ' % * ',
+    'percent': ' % ',
+    '% of': ' % * '
+}
+_SPOKEN_RE = re.compile(
+    r'(?<![a-z])(' + '|'.join(re.escape(p) for p in sorted(_SPOKEN, key=len, reverse=True)) + r')(?![a-z])'
+    r'|(?<=\d)\s*[x×]\s*(?=[\d(.])'
+)
+
+# Wording around an expression that does not change its meaning
+_LEADING = re.compile(r"^(?:calculate|compute|evaluate|solve|what is|what's|whats|how much is)\s+")
+_TRAILING = re.compile(r"(?:\s*(?:please|equals|=|\?|!))*\s*$")
+# Fallback for expressions embedded in a sentence
+_SPAN = re.compile(r'(?:sqrt\s*|mod\s+|[\d.+\-*/^%()]\s*)+')
+
+# "9/11", "12/25/2024": a date, not a division
+_DATE = re.compile(r'^(\d{1,2})/(\d{1,2})/(?:\d{2}|\d{4})$')
+# Day/month pairs that are names of events rather than fractions
+NAMED_DATES = frozenset(['9/11'])
+
+_TOKEN = re.compile(r'\s*(?:(\d+(?:\.\d*)?|\.\d+)|(\*\*|[-+*/^%()÷])|(sqrt|mod)\b)')
+_PARENS = ('(', ')')
+
+# operator -> (precedence, right associative)
+_BINARY = {
+    '+': (1, False),
+    '-': (1, False),
+    '*': (2, False),
+    '/': (2, False),
+    'mod': (2, False),
+    '^': (4, True),
+    '**': (4, True),
+    '÷': (2, False)
+}
+_UNARY_PRECEDENCE = 3  # -2^2 == -4, 2^-1 == 0.5
+
+def _spoken(match):
+    phrase = match.group(1)
+    # Otherwise an "x" between two numbers
+    return _SPOKEN[phrase] if phrase else ' * '
+
+def normalize(text):
+    """Lowercase, rewrite spoken operators as symbols and drop filler words."""
+    text = _SPOKEN_RE.sub(_spoken, text.lower().strip())
+    text = _LEADING.sub('', text.strip())
+    return _TRAILING.sub('', text)
+
+def tokenize(expression):
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise LimitExceeded("expression too long")
+    tokens = []
+    pos = 0
+    end = len(expression.rstrip())
+    while pos < end:
+        m = _TOKEN.match(expression, pos)
+        if not m:
+            raise MathError(f"unexpected input at {pos}")
+        number, op, word = m.groups()
+        if number is not None:
+            value = float(number) if '.' in number else int(number)
+            if abs(value) > MAX_MAGNITUDE:
+                raise LimitExceeded("number too large")
+            tokens.append(value)
+        else:
+            tokens.append(op or word)
+        if len(tokens) > MAX_TOKENS:
+            raise LimitExceeded("expression too long")
+        pos = m.end()
+    return tokens
+
+class _Parser:
+    """Precedence climbing over a token list, evaluating as it parses."""
+    __slots__ = ('tokens', 'pos', 'steps')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.steps = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise MathError("empty expression")
+        value = self.expression(0, 0)
+        if self.pos != len(self.tokens):
+            raise MathError(f"unexpected {self.peek()!r}")
+        return value
+
+    def expression(self, min_precedence, depth):
+        left = self.operand(depth)
+        while True:
+            op = self.peek()
+            if not isinstance(op, str) or op not in _BINARY:
+                return left
+            precedence, right_assoc = _BINARY[op]
+            if precedence < min_precedence:
+                return left
+            self.pos += 1
+            right = self.expression(precedence if right_assoc else precedence + 1, depth + 1)
+            left = self.apply(op, left, right)
+
+    def operand(self, depth):
+        if depth > MAX_DEPTH:
+            raise LimitExceeded("expression nested too deeply")
+        token = self.take()
+        if token is None:
+            raise MathError("expression ends early")
+        if token == '(':
+            value = self.expression(0, depth + 1)
+            if self.take() != ')':
+                raise MathError("missing ')'")
+        elif token in ('-', '+'):
+            value = self.expression(_UNARY_PRECEDENCE, depth + 1)
+            value = self.check(-value if token == '-' else value)
+        elif token == 'sqrt':
+            value = self.expression(_UNARY_PRECEDENCE, depth + 1)
+            if value < 0:
+                raise MathError("square root of a negative number")
+            value = self.check(math.sqrt(value))
+        elif isinstance(token, str):
+            raise MathError(f"unexpected {token!r}")
+        else:
+            value = token
+
+        # Postfix percent: "20%" == 0.2
+        while self.peek() == '%':
+            self.pos += 1
+            value = self.check(value / 100)
+        return value
+
+    def apply(self, op, left, right):
+        if op == '+':
+            result = left + right
+        elif op == '-':
+            result = left - right
+        elif op == '*':
+            result = left * right
+        elif op in ('/', '÷'):
+            if right == 0:
+                raise DivisionByZero("division by zero")
+            result = left / right
+        elif op == 'mod':
+            if right == 0:
+                raise DivisionByZero("division by zero")
+            result = left % right
+        else:
+            result = self.power(left, right)
+        return self.check(result)
+
+    def power(self, base, exponent):
+        if abs(exponent) > MAX_EXPONENT:
+            raise LimitExceeded("exponent too large")
+        if base == 0 and exponent < 0:
+            raise DivisionByZero("division by zero")
+        # Reject before computing anything large; a negative log means the
+        # result shrinks ("10 ^ -16", "0.5 ^ 60")
+        if base not in (0, 1, -1) and exponent * math.log10(abs(base)) > math.log10(MAX_MAGNITUDE):
+            raise LimitExceeded("result too large")
+        if base < 0 and exponent != int(exponent):
+            raise MathError("fractional power of a negative number")
+        try:
+            return base ** exponent
+        except OverflowError:
+            raise LimitExceeded("result too large") from None
+
+    def check(self, value):
+        self.steps += 1
+        if self.steps > MAX_STEPS:
+            raise LimitExceeded("expression too long")
+        if isinstance(value, float) and not math.isfinite(value) or abs(value) > MAX_MAGNITUDE:
+            raise LimitExceeded("result too large")
+        return value
+
+def evaluate(expression):
+    """
+    Evaluate an arithmetic expression: + - * / mod ^ (or **), parentheses,
+    unary minus, sqrt and postfix %. Raises MathError.
+    """
+    return _Parser(tokenize(expression)).parse()
+
+def is_expression(text):
+    """True if ``text`` is nothing but an arithmetic question ("what is 5 times 3")."""
+    if not any(ch.isdigit() for ch in text):
+        return False
+    expression = normalize(text)
+    if is_date(expression):
+        return False
+    try:
+        tokens = tokenize(expression)
+    except MathError:
+        return False
+    # A bare number is not a calculation
+    return any(isinstance(token, str) and token not in _PARENS for token in tokens)
+
+def is_date(expression):
+    """
+    True for a month/day/year written with slashes ("12/25/2024") or a
+    date known by name ("9/11"). Other pairs such as "8/2" are division.
+    """
+    expression = expression.strip()
+    if expression in NAMED_DATES:
+        return True
+    m = _DATE.match(expression)
+    return bool(m) and 1 <= int(m.group(1)) <= 12 and 1 <= int(m.group(2)) <= 31
+
+def extract_expression(text):
+    """
+    The arithmetic part of ``text``: the whole normalized query if it is an
+    expression, otherwise the longest run of expression characters in it.
+    """
+    expression = normalize(text)
+    try:
+        tokenize(expression)
+        return expression
+    except LimitExceeded:
+        raise
+    except MathError:
+        pass
+    spans = [span for span in _SPAN.findall(expression) if any(ch.isdigit() for ch in span)]
+    if not spans:
+        raise MathError("no expression found")
+    return max(spans, key=len)
+
+def format_number(value):
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.10g}"
+    return str(value)
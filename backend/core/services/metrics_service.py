@@ -0,0 +1,157 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+# Request latency buckets in seconds: sub-millisecond local answers up to
+# slow upstream searches and speech synthesis.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self.lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = Lock()
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            # First bucket with value <= bound; len(buckets) is +Inf
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        with self.lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self.lock:
+            series_list = sorted((labels, list(series)) for labels, series in self._series.items())
+        names = self.label_names + ('le',)
+        for labels, series in series_list:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+class Registry:
+    """
+    Metrics exposed on /metrics. Besides its own counters and histograms it
+    renders collectors: callables returning the current value(s) of a
+    statistic that another component already tracks (cache stats, sessions).
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self._metrics = []
+        self._collectors = {}
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        with self.lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collector(self, name, help, kind, fn, label=None):
+        """
+        ``fn`` returns a number, or a dict of label value -> number when
+        ``label`` is set. Registering a name again replaces its collector.
+        """
+        with self.lock:
+            self._collectors[name] = (name, help, kind, fn, label)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, help, kind, fn, label in collectors:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if label is None:
+                lines.append(f"{name} {_number(value)}")
+            else:
+                for label_value, number in sorted(value.items()):
+                    lines.append(f"{name}{_labels((label,), (label_value,))} {_number(number)}")
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# Shared instruments; the services record into these directly
+stage_seconds = registry.histogram(
+    'echo_stage_seconds', 'Time spent in each stage of a request.', labels=('stage',))
+request_seconds = registry.histogram(
+    'echo_request_seconds', 'End-to-end handler time.', labels=('endpoint',))
+routes_total = registry.counter(
+    'echo_routes_total', 'Responses by the generate_response branch that produced them.', labels=('route',))
+backend_requests_total = registry.counter(
+    'echo_backend_requests_total', 'Upstream lookups by backend and outcome.', labels=('backend', 'outcome'))
@@ -1,8 +1,91 @@
-import wikipedia
-try:
-    from ddgs import DDGS
-except ImportError:
-    from duckduckgo_search import DDGS
+import logging
+import os
+from .breaker_service import CircuitBreaker, CircuitOpenError
+from .cache_service import TTLCache, SingleFlight, MISSING, normalize_query
+from .keyword_service import query_features
+from .metrics_service import backend_requests_total, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+NO_RESULTS_MESSAGE = "I couldn't find anything on the web about that right now."
+CONNECTION_ERROR_MESSAGE = "I'm having trouble connecting to the internet."
+
+# Answer cache shared by both backends. Time-sensitive ("latest/news/price")
+# answers expire quickly, evergreen ones are kept much longer.
+SHORT_TTL = int(os.environ.get('ECHO_SEARCH_CACHE_SHORT_TTL', 120))
+LONG_TTL = int(os.environ.get('ECHO_SEARCH_CACHE_TTL', 6 * 3600))
+# Expired answers are kept a while longer, to be served while a backend is down.
+answer_cache = TTLCache(
+    max_entries=int(os.environ.get('ECHO_SEARCH_CACHE_SIZE', 2048)),
+    default_ttl=LONG_TTL,
+    stale_ttl=int(os.environ.get('ECHO_SEARCH_CACHE_STALE_TTL', 24 * 3600))
+)
+
+# Concurrent misses for the same key share one upstream request.
+inflight = SingleFlight()
+
+# One circuit breaker per backend (see breaker_service.py): calls time out
+# after twice their recent p95 latency, and a backend that keeps failing is
+# skipped for ECHO_BREAKER_COOLDOWN seconds instead of stalling every request.
+# Each breaker's thread pool and pending-call limit are sized to the serving
+# concurrency (ECHO_ASGI_WORKERS request threads), so a burst of healthy
+# lookups is queued rather than rejected.
+SERVING_CONCURRENCY = int(os.environ.get('ECHO_ASGI_WORKERS', 256))
+
+def _breaker(name):
+    return CircuitBreaker(
+        name,
+        window=int(os.environ.get('ECHO_BREAKER_WINDOW', 20)),
+        failure_rate=float(os.environ.get('ECHO_BREAKER_FAILURE_RATE', 0.5)),
+        cooldown=float(os.environ.get('ECHO_BREAKER_COOLDOWN', 30)),
+        min_timeout=float(os.environ.get('ECHO_SEARCH_MIN_TIMEOUT', 0.5)),
+        max_timeout=float(os.environ.get('ECHO_SEARCH_TIMEOUT', 5)),
+        max_workers=int(os.environ.get('ECHO_BREAKER_WORKERS', min(64, SERVING_CONCURRENCY))),
+        max_pending=int(os.environ.get('ECHO_BREAKER_MAX_PENDING', SERVING_CONCURRENCY))
+    )
+
+breakers = {'wikipedia': _breaker('wikipedia'), 'duckduckgo': _breaker('duckduckgo')}
+
+def reset_breakers():
+    """Replace the breakers with fresh closed ones, dropping their latency history."""
+    global breakers
+    breakers = {name: _breaker(name) for name in breakers}
+
+# The search clients pull in requests/bs4 and are imported on first use
+# so they don't slow down startup.
+DDGS = None
+
+def _ddgs_client():
+    global DDGS
+    if DDGS is None:
+        try:
+            from ddgs import DDGS as client
+        except ImportError:
+            from duckduckgo_search import DDGS as client
+        DDGS = client
+    return DDGS
+
+def is_time_sensitive(query):
+    # TIME_SENSITIVE_WORDS in keyword_service.py
+    return query_features(query).time_sensitive
+
+def get_cache_stats() -> dict:
+    stats = answer_cache.stats()
+    stats['single_flight'] = inflight.stats()
+    return stats
+
+def get_breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+def _stale_answer(backend, cache_key, error):
+    # The backend failed or its circuit is open: fall back to an expired answer
+    outcome = 'short_circuit' if isinstance(error, CircuitOpenError) else \
+        'timeout' if isinstance(error, TimeoutError) else 'error'
+    backend_requests_total.inc(backend, outcome)
+    stale = answer_cache.get_stale(cache_key)
+    if stale is not MISSING:
+        backend_requests_total.inc(backend, 'stale')
+    return stale
 
 def search_wikipedia(text):
     """
@@ -14,64 +97,119 @@ def search_wikipedia(text):
     for prefix in ["who is", "what is", "tell me about", "search for", "define"]:
         if clean_query.lower().startswith(prefix):
             clean_query = clean_query[len(prefix):].strip()
-            
-    print(f"Searching Wikipedia for: {clean_query}")
+
+    cache_key = 'wiki:' + normalize_query(clean_query)
+    cached = answer_cache.get(cache_key)
+    if cached is not MISSING:
+        logger.debug("Wikipedia cache hit for: %s", clean_query)
+        backend_requests_total.inc('wikipedia', 'cache_hit')
+        return cached
+
+    breaker = breakers['wikipedia']
+    try:
+        with stage_seconds.time('wikipedia'):
+            summary = inflight.do(cache_key, lambda: breaker.call(lambda: _fetch_wikipedia(clean_query, cache_key)))
+        backend_requests_total.inc('wikipedia', 'ok')
+        return summary
+    except Exception as e:
+        # Network errors are not cached so the next request retries
+        logger.warning("Wikipedia Error: %s", e)
+        stale = _stale_answer('wikipedia', cache_key, e)
+        return None if stale is MISSING else stale
+
+def _fetch_wikipedia(clean_query, cache_key):
+    import wikipedia
+    logger.debug("Searching Wikipedia for: %s", clean_query)
     try:
         # Get a brief summary (2 sentences is usually enough for TTS)
         summary = wikipedia.summary(clean_query, sentences=2)
-        return summary
     except wikipedia.exceptions.DisambiguationError as e:
         # If ambiguous, try the first option
         try:
-            return wikipedia.summary(e.options[0], sentences=2)
+            summary = wikipedia.summary(e.options[0], sentences=2)
         except:
             return None
     except wikipedia.exceptions.PageError:
-        return None # Fallback to DuckDuckGo
-    except Exception as e:
-        print(f"Wikipedia Error: {e}")
-        return None
+        summary = None # Fallback to DuckDuckGo
+
+    answer_cache.set(cache_key, summary, SHORT_TTL if is_time_sensitive(clean_query) else LONG_TTL)
+    return summary
 
 def search_duckduckgo(query):
+    cache_key = 'ddg:' + normalize_query(query)
+    cached = answer_cache.get(cache_key)
+    if cached is not MISSING:
+        logger.debug("Search cache hit for: %s", query)
+        backend_requests_total.inc('duckduckgo', 'cache_hit')
+        return cached
+
+    breaker = breakers['duckduckgo']
     try:
-        print(f"Searching for: {query}") 
+        with stage_seconds.time('duckduckgo'):
+            response = inflight.do(cache_key, lambda: _cached_duckduckgo(query, cache_key, breaker))
+        backend_requests_total.inc('duckduckgo', 'ok')
+        return response
+    except Exception as e:
+        logger.warning("Error searching DuckDuckGo: %s", e)
+        stale = _stale_answer('duckduckgo', cache_key, e)
+        return CONNECTION_ERROR_MESSAGE if stale is MISSING else stale
+
+def _cached_duckduckgo(query, cache_key, breaker):
+    # Check for "latest" intent
+    time_sensitive = is_time_sensitive(query)
+    results = breaker.call(lambda: _fetch_duckduckgo(query, 'd' if time_sensitive else None)) # Last day
+    # Outside the DuckDuckGo call, so a nested Wikipedia lookup's latency and
+    # failures are charged to Wikipedia's breaker only
+    response = _duckduckgo_answer(results)
+    answer_cache.set(cache_key, response, SHORT_TTL if time_sensitive or response == NO_RESULTS_MESSAGE else LONG_TTL)
+    return response
 
-        # Check for "latest" intent
-        timelimit = None
-        if any(w in query.lower() for w in ['latest', 'current', 'news', 'today', 'now', 'price', 'stock']):
-             timelimit = 'd' # Last day
+def _is_no_results(error):
+    # The base DDGSException (not its rate-limit/timeout subclasses) with the
+    # message ddgs uses when every provider came back empty
+    return type(error).__name__ in ('DDGSException', 'DuckDuckGoSearchException') \
+        and 'no results' in str(error).lower()
 
-        with DDGS() as ddgs:
+def _fetch_duckduckgo(query, timelimit):
+    logger.debug("Searching for: %s", query)
+
+    client = _ddgs_client()
+    try:
+        with client() as ddgs:
             # Enforce 'us-en' region for better English results
-            results = list(ddgs.text(query, region='us-en', safesearch='moderate', timelimit=timelimit, max_results=3)) 
-            
-            if results:
-                print(f"Text results found: {len(results)}")
-                
-                # Intelligent Fallback: 
-                # If the top result is a Wikipedia entry, prefer the clean Wikipedia summary over the DDG snippet.
-                top_result = results[0]
-                if 'wikipedia.org' in top_result.get('href', ''):
-                    print("Top result is Wikipedia, attempting to get clean summary...")
-                    wiki_summary = search_wikipedia(top_result.get('title', '').replace(' - Wikipedia', ''))
-                    if wiki_summary:
-                        return f"According to Wikipedia: {wiki_summary}"
-
-                # Standard behavior
-                source_name = top_result.get('title', 'Source')
-                body_text = top_result.get('body', '')
-                
-                # Construct response with attribution
-                response = f"According to {source_name}: {body_text}"
-                
-                # Check length for TTS (approx 3 sentences or 350 chars)
-                if len(response) > 350:
-                    response = response[:347] + "..."
-                return response
-            else:
-                print("No text results found.")
-                return "I couldn't find anything on the web about that right now."
-                
+            results = list(ddgs.text(query, region='us-en', safesearch='moderate', timelimit=timelimit, max_results=3))
     except Exception as e:
-        print(f"Error searching DuckDuckGo: {e}")
-        return "I'm having trouble connecting to the internet."
+        # ddgs 9.x raises instead of returning an empty list; that is an
+        # answer, not a backend failure for the circuit breaker
+        if not _is_no_results(e):
+            raise
+        results = []
+
+    logger.debug("Text results found: %d", len(results))
+    return results
+
+def _duckduckgo_answer(results):
+    if not results:
+        logger.debug("No text results found.")
+        return NO_RESULTS_MESSAGE
+
+    # Intelligent Fallback:
+    # If the top result is a Wikipedia entry, prefer the clean Wikipedia summary over the DDG snippet.
+    top_result = results[0]
+    if 'wikipedia.org' in top_result.get('href', ''):
+        logger.debug("Top result is Wikipedia, attempting to get clean summary...")
+        wiki_summary = search_wikipedia(top_result.get('title', '').replace(' - Wikipedia', ''))
+        if wiki_summary:
+            return f"According to Wikipedia: {wiki_summary}"
+
+    # Standard behavior
+    source_name = top_result.get('title', 'Source')
+    body_text = top_result.get('body', '')
+
+    # Construct response with attribution
+    response = f"According to {source_name}: {body_text}"
+
+    # Check length for TTS (approx 3 sentences or 350 chars)
+    if len(response) > 350:
+        response = response[:347] + "..."
+    return response
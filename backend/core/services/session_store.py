@@ -0,0 +1,381 @@
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from threading import Lock, local
+
+# Storage backends for ConversationManager. A store implements:
+#   get_session(session_id) -> dict        live (memory) or snapshot (sqlite)
+#   get_history(session_id) -> list        Message records, oldest first
+#   add_messages(session_id, records)      append several Messages in one write
+#   export_session(session_id) -> dict     JSON-ready copy, or None
+#   clear_session(session_id)
+#   stats() -> dict
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+class Message:
+    """
+    One history entry. Kept deliberately small: slots instead of a dict,
+    an epoch float instead of an ISO string, and interned role/intent labels
+    shared by every message. Use to_dict() when serializing for output.
+    """
+    __slots__ = ('role', 'message', 'timestamp', 'intent')
+
+    def __init__(self, role, message, intent=None, timestamp=None):
+        self.role = sys.intern(role)
+        self.message = message
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.intent = sys.intern(str(intent)) if intent else None
+
+    def to_dict(self) -> dict:
+        return {
+            'role': self.role,
+            'message': self.message,
+            'timestamp': _iso(self.timestamp),
+            'intent': self.intent
+        }
+
+def _export(history, created_at, analytics):
+    return {
+        'history': [msg.to_dict() for msg in history],
+        'created_at': _iso(created_at),
+        'analytics': dict(
+            analytics,
+            session_start=_iso(analytics['session_start']),
+            last_active=_iso(analytics['last_active'])
+        )
+    }
+
+class _SessionShard:
+    """
+    One lock stripe of MemorySessionStore: its own sessions, analytics and
+    LRU index, guarded by its own lock.
+    """
+    def __init__(self, max_history, session_ttl, max_sessions):
+        self.lock = Lock()
+        self.max_history = max_history
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.analytics = {}
+        self.last_seen = OrderedDict()  # session_id -> monotonic time, LRU order
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_create(self, session_id):
+        # Called with the lock held
+        now = time.monotonic()
+        self._expire(now)
+        if session_id not in self.sessions:
+            current_time = time.time()
+            self.sessions[session_id] = {
+                'history': deque(maxlen=self.max_history),
+                'context': {},
+                'created_at': current_time
+            }
+            self.analytics[session_id] = {
+                'total_messages': 0,
+                'commands_used': {},
+                'session_start': current_time,
+                'last_active': current_time
+            }
+            while len(self.sessions) > self.max_sessions:
+                oldest, _ = self.last_seen.popitem(last=False)
+                self.drop(oldest)
+                self.evictions += 1
+        else:
+            self.analytics[session_id]['last_active'] = time.time()
+        self.last_seen[session_id] = now
+        self.last_seen.move_to_end(session_id)
+        return self.sessions[session_id], self.analytics[session_id]
+
+    def _expire(self, now):
+        # LRU order is also idle-time order, so expired sessions sit at the front
+        cutoff = now - self.session_ttl
+        while self.last_seen:
+            session_id, last_seen = next(iter(self.last_seen.items()))
+            if last_seen > cutoff:
+                break
+            del self.last_seen[session_id]
+            self.drop(session_id)
+            self.expirations += 1
+
+    def drop(self, session_id):
+        # Called with the lock held
+        self.last_seen.pop(session_id, None)
+        self.sessions.pop(session_id, None)
+        self.analytics.pop(session_id, None)
+
+class MemorySessionStore:
+    """
+    Default store: process-local dicts spread over ``num_shards`` lock
+    stripes by hash(session_id), so requests for different users rarely
+    contend on the same lock. Not shared between worker processes.
+    """
+    def __init__(self, max_history=50, session_ttl=1800, max_sessions=10000, num_shards=16):
+        self.max_sessions = max_sessions
+        per_shard = max(1, -(-max_sessions // num_shards))
+        self._shards = [_SessionShard(max_history, session_ttl, per_shard) for _ in range(num_shards)]
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get_session(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.get_or_create(session_id)[0]
+
+    def get_history(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return list(shard.get_or_create(session_id)[0]['history'])
+
+    def add_messages(self, session_id, records):
+        shard = self._shard(session_id)
+        with shard.lock:
+            session, analytics = shard.get_or_create(session_id)
+            commands_used = analytics['commands_used']
+            for record in records:
+                session['history'].append(record)
+                analytics['total_messages'] += 1
+                if record.intent:
+                    commands_used[record.intent] = commands_used.get(record.intent, 0) + 1
+
+    def export_session(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return None
+            history = list(session['history'])
+            analytics = dict(shard.analytics[session_id])
+            analytics['commands_used'] = dict(analytics['commands_used'])
+        return _export(history, session['created_at'], analytics)
+
+    def clear_session(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.drop(session_id)
+
+    def stats(self) -> dict:
+        resident = evictions = expirations = 0
+        now = time.monotonic()
+        for shard in self._shards:
+            with shard.lock:
+                # Idle shards only expire sessions when touched; sweep so
+                # expired sessions are not counted as resident
+                shard._expire(now)
+                resident += len(shard.sessions)
+                evictions += shard.evictions
+                expirations += shard.expirations
+        return {
+            'backend': 'memory',
+            'resident': resident,
+            'max_sessions': self.max_sessions,
+            'shards': len(self._shards),
+            'evictions': evictions,
+            'expirations': expirations
+        }
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_active REAL NOT NULL,
+    total_messages INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    intent TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS commands (
+    session_id TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (session_id, intent)
+);
+'''
+
+class SQLiteSessionStore:
+    """
+    Store backed by one SQLite file in WAL mode, shared by every worker
+    process on the host, so a follow-up question can land on any worker.
+    Each add_messages() call writes all of its records in one transaction.
+    Expired and over-cap sessions are swept at most every
+    ``sweep_interval`` seconds instead of on every request.
+    """
+    def __init__(self, path, max_history=50, session_ttl=1800, max_sessions=10000, sweep_interval=60):
+        self.path = path
+        self.max_history = max_history
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._local = local()
+        self._last_sweep = 0.0
+        self.evictions = 0
+        self.expirations = 0
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_session(self, session_id):
+        history = deque(self.get_history(session_id), maxlen=self.max_history)
+        row = self._conn().execute(
+            'SELECT created_at FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return {'history': history, 'context': {}, 'created_at': row[0] if row else time.time()}
+
+    def get_history(self, session_id):
+        rows = self._conn().execute(
+            '''SELECT m.role, m.message, m.timestamp, m.intent
+               FROM messages m JOIN sessions s ON s.session_id = m.session_id
+               WHERE m.session_id = ? AND s.last_active > ?
+               ORDER BY m.id DESC LIMIT ?''',
+            (session_id, time.time() - self.session_ttl, self.max_history)
+        ).fetchall()
+        return [Message(role, message, intent, timestamp) for role, message, timestamp, intent in reversed(rows)]
+
+    def add_messages(self, session_id, records):
+        now = time.time()
+        cutoff = now - self.session_ttl
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # An idle session that has not been swept yet starts over
+            expired = conn.execute(
+                'SELECT 1 FROM sessions WHERE session_id = ? AND last_active <= ?', (session_id, cutoff)
+            ).fetchone()
+            if expired:
+                self._delete(conn, session_id)
+            conn.execute(
+                '''INSERT INTO sessions (session_id, created_at, last_active, total_messages)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (session_id) DO UPDATE SET
+                       last_active = excluded.last_active,
+                       total_messages = total_messages + excluded.total_messages''',
+                (session_id, now, now, len(records))
+            )
+            conn.executemany(
+                'INSERT INTO messages (session_id, role, message, timestamp, intent) VALUES (?, ?, ?, ?, ?)',
+                [(session_id, r.role, r.message, r.timestamp, r.intent) for r in records]
+            )
+            conn.executemany(
+                '''INSERT INTO commands (session_id, intent, count) VALUES (?, ?, 1)
+                   ON CONFLICT (session_id, intent) DO UPDATE SET count = count + 1''',
+                [(session_id, r.intent) for r in records if r.intent]
+            )
+            conn.execute(
+                '''DELETE FROM messages WHERE session_id = ? AND id <= (
+                       SELECT id FROM messages WHERE session_id = ?
+                       ORDER BY id DESC LIMIT 1 OFFSET ?)''',
+                (session_id, session_id, self.max_history)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if time.monotonic() - self._last_sweep > self.sweep_interval:
+            self._sweep()
+
+    def _delete(self, conn, session_id):
+        conn.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+        conn.execute('DELETE FROM commands WHERE session_id = ?', (session_id,))
+        conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def _sweep(self):
+        self._last_sweep = time.monotonic()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = [row[0] for row in conn.execute(
+                'SELECT session_id FROM sessions WHERE last_active <= ?', (time.time() - self.session_ttl,)
+            )]
+            overflow = [row[0] for row in conn.execute(
+                'SELECT session_id FROM sessions ORDER BY last_active DESC LIMIT -1 OFFSET ?', (self.max_sessions,)
+            ) if row[0] not in expired]
+            for session_id in expired + overflow:
+                self._delete(conn, session_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self.expirations += len(expired)
+        self.evictions += len(overflow)
+
+    def export_session(self, session_id):
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT created_at, last_active, total_messages FROM sessions WHERE session_id = ? AND last_active > ?',
+            (session_id, time.time() - self.session_ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        created_at, last_active, total_messages = row
+        commands_used = dict(conn.execute(
+            'SELECT intent, count FROM commands WHERE session_id = ?', (session_id,)
+        ).fetchall())
+        analytics = {
+            'total_messages': total_messages,
+            'commands_used': commands_used,
+            'session_start': created_at,
+            'last_active': last_active
+        }
+        return _export(self.get_history(session_id), created_at, analytics)
+
+    def clear_session(self, session_id):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._delete(conn, session_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stats(self) -> dict:
+        resident = self._conn().execute(
+            'SELECT COUNT(*) FROM sessions WHERE last_active > ?', (time.time() - self.session_ttl,)
+        ).fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'resident': resident,
+            'max_sessions': self.max_sessions,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+def create_session_store(url='memory', **limits):
+    """
+    Build a store from a URL: 'memory' (default) or 'sqlite:///path/to/sessions.db'.
+    ``limits`` (max_history, session_ttl, max_sessions) are passed to the store.
+    """
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        return SQLiteSessionStore(path, **limits)
+    if url == 'memory':
+        return MemorySessionStore(**limits)
+    raise ValueError(f"Unknown session store: {url}")
@@ -0,0 +1,150 @@
+import atexit
+import json
+import logging
+import os
+import time
+import uuid
+from threading import Event, Thread
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshots are written without the cross-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Warm restarts: the search answer cache and the audio clip index are
+# written to JSON-lines files every few minutes and at exit, and read back
+# at startup so a fresh worker does not start cold. Expiry times are stored
+# as wall-clock timestamps; entries that expired while the process was down
+# are dropped on load.
+ANSWERS_FILE = 'answers.jsonl'
+
+def read_records(path):
+    """Yield the JSON objects in a JSON-lines file, skipping lines that do not parse."""
+    try:
+        f = open(path, encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line, e.g. the disk filled up mid-write
+                continue
+            if isinstance(record, dict):
+                yield record
+
+def is_number(value):
+    # bool is an int subclass but never a valid size or timestamp
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def write_records(path, records):
+    """Atomically replace ``path`` with one JSON object per line."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')))
+                f.write('\n')
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class _FileLock:
+    # Serializes snapshot writers across worker processes sharing a directory
+    def __init__(self, path):
+        self.path = path + '.lock'
+
+    def __enter__(self):
+        self.f = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+        return False
+
+def save_answers(cache, path):
+    """
+    Write the entries of a TTLCache to ``path``. Entries that other workers
+    saved and this one does not hold are carried over, so workers sharing
+    the file add to it instead of overwriting each other. Returns the number
+    of entries written.
+    """
+    now = time.time()
+    own = [{'key': key, 'value': value, 'expires_at': now + ttl} for key, value, ttl in cache.snapshot()]
+    keys = {record['key'] for record in own}
+    with _FileLock(path):
+        others = [
+            record for record in read_records(path)
+            if isinstance(record.get('key'), str) and record['key'] not in keys
+            and is_number(record.get('expires_at')) and record['expires_at'] + cache.stale_ttl > now
+        ]
+        # Ours were used more recently; the file is least recently used first
+        records = (others + own)[-cache.max_entries:]
+        write_records(path, records)
+    return len(records)
+
+def load_answers(cache, path):
+    """Restore entries saved by save_answers() that have not expired since. Returns the number restored."""
+    now = time.time()
+    entries = []
+    skipped = 0
+    for record in read_records(path):
+        if isinstance(record.get('key'), str) and is_number(record.get('expires_at')):
+            entries.append((record['key'], record.get('value'), record['expires_at'] - now))
+        else:
+            skipped += 1
+    if skipped:
+        logger.warning("Skipped %d malformed records in %s", skipped, path)
+    return cache.restore(entries)
+
+class CacheSnapshotter(Thread):
+    """
+    Saves the answer cache and the audio index every ``interval`` seconds,
+    and once more when the process exits.
+    """
+    def __init__(self, answer_cache, directory, audio_cache=None, interval=300):
+        super().__init__(name='echo-cache-snapshot', daemon=True)
+        self.answer_cache = answer_cache
+        self.answers_path = os.path.join(directory, ANSWERS_FILE)
+        self.audio_cache = audio_cache
+        self.interval = interval
+        self.stopped = Event()
+
+    def load(self):
+        started = time.perf_counter()
+        try:
+            answers = load_answers(self.answer_cache, self.answers_path)
+        except Exception as e:
+            # A bad snapshot only costs a cold start
+            logger.error("Error loading cache snapshot: %s", e)
+            return 0
+        logger.info("Restored %d cached answers in %.1f ms", answers, (time.perf_counter() - started) * 1000)
+        return answers
+
+    def save(self):
+        try:
+            save_answers(self.answer_cache, self.answers_path)
+            if self.audio_cache is not None:
+                self.audio_cache.save_index()
+        except Exception as e:
+            logger.error("Error saving cache snapshot: %s", e)
+
+    def start(self):
+        atexit.register(self.stop)
+        super().start()
+
+    def stop(self):
+        self.stopped.set()
+        self.save()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.save()
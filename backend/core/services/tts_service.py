@@ -0,0 +1,272 @@
+import hashlib
+import heapq
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from .cache_service import SingleFlight
+from .metrics_service import stage_seconds
+from .snapshot_service import is_number, read_records, write_records
+
+logger = logging.getLogger(__name__)
+
+# Sentences synthesized ahead of the one currently being streamed
+STREAM_LOOKAHEAD = int(os.environ.get('ECHO_TTS_STREAM_LOOKAHEAD', 3))
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_synthesis_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ECHO_TTS_WORKERS', 8)),
+    thread_name_prefix='echo-tts'
+)
+
+# Clip index saved next to the clips (see save_index)
+INDEX_FILE = 'index.jsonl'
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text):
+    return [s for s in (part.strip() for part in _SENTENCE_END.split(text)) if s]
+
+def audio_key(text, lang='en'):
+    """Content address of a clip: the same (text, lang) always maps to the same file."""
+    return hashlib.sha256(f"{lang}\0{text}".encode('utf-8')).hexdigest()[:32]
+
+class AudioCache:
+    """
+    On-disk cache of synthesized speech, one MP3 per (text, lang) hash.
+    Clips expire ``retention`` seconds after their last use and the total
+    size is capped by ``max_bytes`` (least recently used clips go first).
+    Deletion happens in reap(), which AudioJanitor runs off the request path.
+    """
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, retention=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self._entries = OrderedDict()  # filename -> size in bytes, LRU order
+        self._expiry = {}              # filename -> current expiry time
+        self._heap = []                # (expiry, filename); stale pairs are skipped
+        self.total_bytes = 0
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.inflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._load()
+
+    def _load(self):
+        # Index clips left over from a previous run, oldest first
+        names = set()
+        for name in os.listdir(self.directory):
+            if name.endswith('.mp3'):
+                names.add(name)
+            elif name.endswith('.part'):
+                # Interrupted synthesis
+                try: os.remove(os.path.join(self.directory, name))
+                except OSError: pass
+
+        # Clips in the saved index keep their LRU position and last-use
+        # expiry without a stat() each; ones already expired are tracked
+        # as such and deleted by the first reap()
+        skipped = 0
+        for record in read_records(self.path(INDEX_FILE)):
+            name, size, expires_at = record.get('file'), record.get('size'), record.get('expires_at')
+            if not (isinstance(name, str) and is_number(size) and size >= 0 and is_number(expires_at)):
+                skipped += 1
+            elif name in names:
+                names.discard(name)
+                self._track(name, int(size), expires_at)
+        if skipped:
+            logger.warning("Skipped %d malformed records in the audio index", skipped)
+
+        # Clips written after the index was saved (or by another worker)
+        files = []
+        for name in names:
+            path = self.path(name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for mtime, name, size in sorted(files):
+            self._track(name, size, mtime + self.retention)
+
+    def save_index(self):
+        """Write the clip index, least recently used first, for the next process to load."""
+        with self.lock:
+            records = [{'file': name, 'size': size, 'expires_at': self._expiry[name]}
+                       for name, size in self._entries.items()]
+        write_records(self.path(INDEX_FILE), records)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _track(self, filename, size, expires_at):
+        # Called with the lock held (or during __init__)
+        self.total_bytes += size - self._entries.pop(filename, 0)
+        self._entries[filename] = size
+        self._expiry[filename] = expires_at
+        heapq.heappush(self._heap, (expires_at, filename))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Too many superseded expiry records; rebuild from the live index
+            self._heap = [(exp, name) for name, exp in self._expiry.items()]
+            heapq.heapify(self._heap)
+        if self.total_bytes > self.max_bytes:
+            self.wakeup.set()
+
+    def _forget(self, filename):
+        # Called with the lock held
+        self.total_bytes -= self._entries.pop(filename, 0)
+        self._expiry.pop(filename, None)
+
+    def get_or_synthesize(self, text, lang='en'):
+        """Return the cached filename for (text, lang), synthesizing it on a miss."""
+        filename = f"{audio_key(text, lang)}.mp3"
+        with self.lock:
+            if filename in self._entries:
+                if os.path.exists(self.path(filename)):
+                    self.hits += 1
+                    self._entries.move_to_end(filename)
+                    self._track(filename, self._entries[filename], time.time() + self.retention)
+                    return filename
+                # Removed behind our back (e.g. by another worker process)
+                self._forget(filename)
+        return self.inflight.do(filename, lambda: self._synthesize(text, lang, filename))
+
+    def _synthesize(self, text, lang, filename):
+        with self.lock:
+            # Another caller may have finished this clip since our lookup
+            if filename in self._entries:
+                self.hits += 1
+                return filename
+
+        from gtts import gTTS  # deferred: pulls in requests, not needed at startup
+
+        # Write to a private temp name first so readers never see a partial file
+        tmp_path = self.path(f"{filename}.{uuid.uuid4().hex}.part")
+        try:
+            with stage_seconds.time('tts'):
+                gTTS(text=text, lang=lang).save(tmp_path)
+            os.replace(tmp_path, self.path(filename))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(self.path(filename))
+        with self.lock:
+            self.misses += 1
+            self._track(filename, size, time.time() + self.retention)
+        return filename
+
+    def reap(self):
+        """
+        Delete expired clips, then the least recently used ones while over
+        the size cap. Returns the number of files removed.
+        """
+        now = time.time()
+        doomed = []
+        with self.lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, name = heapq.heappop(self._heap)
+                if self._expiry.get(name) == expires_at:
+                    self._forget(name)
+                    self.expirations += 1
+                    doomed.append(name)
+            # Never evict the newest clip; it is about to be served
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                name = next(iter(self._entries))
+                self._forget(name)
+                self.evictions += 1
+                doomed.append(name)
+
+        for name in doomed:
+            try: os.remove(self.path(name))
+            except OSError: pass
+        return len(doomed)
+
+    def next_expiry(self):
+        with self.lock:
+            return self._heap[0][0] if self._heap else None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'files': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'retention': self.retention,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class AudioJanitor(Thread):
+    """
+    Background reaper for AudioCache. Sleeps until the next clip expires
+    (at most ``interval`` seconds) or until the cache goes over its size cap.
+    """
+    def __init__(self, audio_cache, interval=60):
+        super().__init__(name='echo-audio-janitor', daemon=True)
+        self.audio_cache = audio_cache
+        self.interval = interval
+
+    def run(self):
+        while True:
+            try:
+                removed = self.audio_cache.reap()
+                if removed:
+                    logger.info("Audio janitor removed %d clip(s)", removed)
+            except Exception as e:
+                logger.error("Error in audio janitor: %s", e)
+
+            timeout = self.interval
+            next_expiry = self.audio_cache.next_expiry()
+            if next_expiry is not None:
+                timeout = min(timeout, max(0.0, next_expiry - time.time()))
+            self.audio_cache.wakeup.wait(timeout)
+            self.audio_cache.wakeup.clear()
+
+def _load_clip(audio_cache, sentence, lang):
+    filename = audio_cache.get_or_synthesize(sentence, lang)
+    with open(audio_cache.path(filename), 'rb') as f:
+        return f.read()
+
+def prefetch_speech(audio_cache, text, lang='en'):
+    """
+    Start synthesizing the first sentence of ``text`` in the background, so
+    a /tts/stream request for the same text finds it cached (or joins the
+    synthesis in flight) instead of starting from scratch.
+    """
+    sentences = split_sentences(text)
+    if sentences:
+        return _synthesis_pool.submit(_load_clip, audio_cache, sentences[0], lang)
+    return None
+
+def stream_speech(audio_cache, text, lang='en'):
+    """
+    Yield MP3 bytes sentence by sentence. Later sentences are synthesized in
+    the background while earlier ones are being sent, so playback can start
+    as soon as the first sentence is ready. Each sentence goes through the
+    audio cache, so repeated sentences are never re-synthesized.
+    """
+    sentences = deque(split_sentences(text))
+    pending = deque()
+    try:
+        while sentences or pending:
+            while sentences and len(pending) <= STREAM_LOOKAHEAD:
+                pending.append(_synthesis_pool.submit(_load_clip, audio_cache, sentences.popleft(), lang))
+            try:
+                clip = pending.popleft().result()
+            except Exception as e:
+                logger.error("Error streaming TTS sentence: %s", e)
+                continue
+            for offset in range(0, len(clip), STREAM_CHUNK_SIZE):
+                yield clip[offset:offset + STREAM_CHUNK_SIZE]
+    finally:
+        # Client went away: drop sentences that have not started yet
+        for future in pending:
+            future.cancel()
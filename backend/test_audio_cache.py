@@ -0,0 +1,60 @@
+import os
+import time
+
+from backend.core.services.tts_service import AudioCache, AudioJanitor
+
+def add_clip(cache, name, size, expires_in=60):
+    # The sizes are only bookkeeping; a one-byte file stands in for the clip
+    with open(cache.path(name), 'wb') as f:
+        f.write(b'x')
+    with cache.lock:
+        cache._track(name, size, time.time() + expires_in)
+
+def test_least_recently_used_clips_go_first_over_the_cap(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    for name in ('a.mp3', 'b.mp3', 'c.mp3'):
+        add_clip(cache, name, 100)
+    add_clip(cache, 'a.mp3', 100)  # used again
+
+    assert cache.reap() == 1
+    assert list(cache._entries) == ['c.mp3', 'a.mp3']
+    assert not os.path.exists(tmp_path / 'b.mp3')
+    assert cache.stats()['bytes'] == 200
+    assert cache.stats()['evictions'] == 1
+
+def test_expired_clips_are_reaped_from_the_heap(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    add_clip(cache, 'old.mp3', 10, expires_in=-1)
+    add_clip(cache, 'renewed.mp3', 10, expires_in=-1)
+    add_clip(cache, 'renewed.mp3', 10, expires_in=60)  # the earlier expiry is now stale
+    add_clip(cache, 'fresh.mp3', 10)
+
+    assert cache.reap() == 1
+    assert sorted(cache._entries) == ['fresh.mp3', 'renewed.mp3']
+    assert not os.path.exists(tmp_path / 'old.mp3')
+    assert cache.stats()['expirations'] == 1
+    assert cache.next_expiry() > time.time()
+
+def test_newest_clip_is_never_evicted(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=100)
+    add_clip(cache, 'small.mp3', 50)
+    add_clip(cache, 'huge.mp3', 500)
+
+    assert cache.reap() == 1
+    assert list(cache._entries) == ['huge.mp3']
+    assert os.path.exists(tmp_path / 'huge.mp3')
+    assert cache.reap() == 0
+
+def test_janitor_wakes_up_when_the_cache_goes_over_its_cap(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=150)
+    AudioJanitor(cache, interval=3600).start()
+    time.sleep(0.05)  # let it finish its first pass and go to sleep
+    add_clip(cache, 'a.mp3', 100)
+    add_clip(cache, 'b.mp3', 100)
+
+    # Without the wakeup the janitor would sleep for the whole interval
+    deadline = time.monotonic() + 2
+    while 'a.mp3' in cache._entries and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert list(cache._entries) == ['b.mp3']
+    assert not os.path.exists(tmp_path / 'a.mp3')
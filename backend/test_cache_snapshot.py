@@ -0,0 +1,74 @@
+import os
+import time
+
+from backend.core.services.cache_service import TTLCache, MISSING
+from backend.core.services.snapshot_service import load_answers, save_answers
+from backend.core.services.tts_service import AudioCache
+
+def test_answer_cache_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'answers.jsonl')
+    cache = TTLCache(max_entries=8, default_ttl=60)
+    cache.set('ddg:capital of peru', "According to Peru: Lima.")
+    cache.set('wiki:asdfgh', None)
+    cache.set('ddg:latest news', "Old news.", ttl=0.01)
+    save_answers(cache, path)
+
+    # Another worker saves to the same file without losing our entries
+    other = TTLCache(max_entries=8, default_ttl=60)
+    other.set('ddg:capital of chile', "According to Chile: Santiago.")
+    save_answers(other, path)
+
+    time.sleep(0.02)
+    fresh = TTLCache(max_entries=8, default_ttl=60)
+    fresh.set('ddg:capital of peru', "Newer answer.")
+    assert load_answers(fresh, path) == 2
+    assert fresh.get('ddg:capital of peru') == "Newer answer."
+    assert fresh.get('ddg:capital of chile') == "According to Chile: Santiago."
+    assert fresh.get('wiki:asdfgh') is None
+    assert fresh.get('ddg:latest news') is MISSING
+
+def test_audio_index_keeps_lru_order_and_expiry(tmp_path):
+    cache = AudioCache(str(tmp_path), retention=60)
+    for name in ('a.mp3', 'b.mp3', 'c.mp3'):
+        with open(tmp_path / name, 'wb') as f:
+            f.write(b'x' * 10)
+        with cache.lock:
+            cache._track(name, 10, time.time() + 60)
+    with cache.lock:
+        cache._track('a.mp3', 10, time.time() + 120)  # used again
+        cache._track('c.mp3', 10, time.time() - 1)    # expired
+    cache.save_index()
+    with open(tmp_path / 'd.mp3', 'wb') as f:
+        f.write(b'x' * 5)  # written after the index was saved
+
+    restored = AudioCache(str(tmp_path), retention=60)
+    assert list(restored._entries) == ['b.mp3', 'a.mp3', 'c.mp3', 'd.mp3']
+    assert restored.total_bytes == 35
+    assert restored.reap() == 1
+    assert not os.path.exists(tmp_path / 'c.mp3')
+
+def test_corrupted_snapshots_are_skipped(tmp_path):
+    (tmp_path / 'answers.jsonl').write_text(
+        '{"key": "ddg:ok", "value": "Fine.", "expires_at": %f}\n' % (time.time() + 60) +
+        '{"key": "ddg:bad time", "value": "x", "expires_at": "soon"}\n'
+        '{"value": "no key", "expires_at": 1}\n'
+        '[1, 2]\n'
+        '{"key": "ddg:torn", "val\n'
+    )
+    cache = TTLCache(max_entries=8)
+    assert load_answers(cache, str(tmp_path / 'answers.jsonl')) == 1
+    assert cache.get('ddg:ok') == "Fine."
+    # ...and dropped when the file is next saved
+    assert save_answers(TTLCache(max_entries=8), str(tmp_path / 'answers.jsonl')) == 1
+
+    for name in ('a.mp3', 'b.mp3', 'c.mp3'):
+        (tmp_path / name).write_bytes(b'x' * 10)
+    (tmp_path / 'index.jsonl').write_text(
+        '{"file": "a.mp3", "expires_at": 1}\n'
+        '{"file": "b.mp3", "size": 10, "expires_at": "tomorrow"}\n'
+        '{"file": "c.mp3", "size": 10, "expires_at": %f}\n' % (time.time() + 60)
+    )
+    audio = AudioCache(str(tmp_path), retention=60)
+    # Bad index records fall back to the files on disk
+    assert sorted(audio._entries) == ['a.mp3', 'b.mp3', 'c.mp3']
+    assert audio.total_bytes == 30
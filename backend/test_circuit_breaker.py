@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.core.services import search_service
+from backend.core.services.breaker_service import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from backend.core.services.cache_service import TTLCache
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def fail():
+    raise ConnectionError("rate limited")
+
+def test_breaker_opens_fails_fast_and_recovers_through_a_probe():
+    clock = Clock()
+    breaker = CircuitBreaker('test', window=10, min_calls=4, failure_rate=0.5, cooldown=30, clock=clock)
+
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.call(lambda: 'ok') == 'ok'
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+
+    # A failed probe after the cooldown opens the circuit again
+    clock.now = 31
+    assert breaker.stats()['state'] == HALF_OPEN
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    clock.now = 62
+    assert breaker.call(lambda: 'back') == 'back'
+    assert breaker.state == CLOSED
+    assert breaker.stats()['opens'] == 2
+
+def test_timeout_adapts_to_observed_latency():
+    breaker = CircuitBreaker('test', min_calls=3, min_timeout=0.05, max_timeout=5.0, timeout_factor=2.0)
+    assert breaker.timeout() == 5.0
+    for _ in range(3):
+        breaker.call(lambda: time.sleep(0.01))
+    assert 0.05 <= breaker.timeout() < 0.1
+
+    with pytest.raises(TimeoutError):
+        breaker.call(lambda: time.sleep(0.5))
+    assert breaker.stats()['timeouts'] == 1
+
+def test_open_circuit_serves_stale_answers(monkeypatch):
+    class BrokenDDGS:
+        calls = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def text(self, query, **kwargs):
+            BrokenDDGS.calls += 1
+            raise ConnectionError("rate limited")
+
+    cache = TTLCache(max_entries=8, stale_ttl=3600)
+    cache.set('ddg:capital of peru', "According to Peru: Lima.", ttl=0)
+    monkeypatch.setattr(search_service, 'answer_cache', cache)
+    monkeypatch.setattr(search_service, 'DDGS', BrokenDDGS)
+    monkeypatch.setattr(search_service, 'breakers', {
+        'wikipedia': CircuitBreaker('wikipedia'),
+        'duckduckgo': CircuitBreaker('duckduckgo', min_calls=2, cooldown=60)
+    })
+
+    assert search_service.search_duckduckgo("capital of Peru") == "According to Peru: Lima."
+    assert search_service.search_duckduckgo("capital of Chile") == search_service.CONNECTION_ERROR_MESSAGE
+    assert search_service.get_breaker_stats()['duckduckgo']['state'] == OPEN
+
+    # Open: no more upstream calls until the cooldown is over
+    assert search_service.search_duckduckgo("capital of Chile") == search_service.CONNECTION_ERROR_MESSAGE
+    assert BrokenDDGS.calls == 2
+
+def test_timed_out_calls_that_never_started_are_cancelled():
+    breaker = CircuitBreaker('test', min_timeout=0.01, max_timeout=0.05, max_workers=1, max_pending=2)
+    release = threading.Event()
+    ran = []
+    try:
+        with pytest.raises(TimeoutError):
+            breaker.call(release.wait)           # occupies the only worker
+        with pytest.raises(TimeoutError):
+            breaker.call(lambda: ran.append(1))  # queued behind it, then cancelled
+        assert breaker.stats()['pending'] == 1
+
+        # A backend that stops answering cannot pile up queued calls
+        breaker.max_pending = 1
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: ran.append(2))
+    finally:
+        release.set()
+
+    time.sleep(0.05)
+    assert ran == []
+    assert breaker.stats()['pending'] == 0
+
+class NoResultsDDGS:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query, **kwargs):
+        # What ddgs 9.x raises when every provider comes back empty
+        class DDGSException(Exception):
+            pass
+        raise DDGSException("No results found.")
+
+def test_no_results_is_an_answer_not_a_backend_failure(monkeypatch):
+    monkeypatch.setattr(search_service, 'answer_cache', TTLCache(max_entries=8))
+    monkeypatch.setattr(search_service, 'DDGS', NoResultsDDGS)
+    monkeypatch.setattr(search_service, 'breakers', {
+        'wikipedia': CircuitBreaker('wikipedia'),
+        'duckduckgo': CircuitBreaker('duckduckgo', min_calls=2)
+    })
+
+    for i in range(4):
+        assert search_service.search_duckduckgo(f"xqzv {i}") == search_service.NO_RESULTS_MESSAGE
+    stats = search_service.get_breaker_stats()['duckduckgo']
+    assert stats['state'] == CLOSED
+    assert stats['recent_failures'] == 0
+
+def test_timeout_grows_back_when_latency_steps_up():
+    clock = Clock()
+    breaker = CircuitBreaker('test', min_timeout=0.01, max_timeout=1.0, cooldown=30, clock=clock)
+    for _ in range(10):
+        breaker.call(lambda: time.sleep(0.005))
+    assert breaker.timeout() < 0.05
+
+    outcomes = []
+    for _ in range(12):
+        try:
+            breaker.call(lambda: time.sleep(0.1))
+            outcomes.append('ok')
+        except TimeoutError:
+            outcomes.append('timeout')
+        except CircuitOpenError:
+            outcomes.append('open')
+            clock.now += 31  # the probe after the cooldown gets max_timeout
+    # Timed-out calls raise the estimate until the slower backend fits again
+    assert outcomes[-5:] == ['ok'] * 5
+    assert breaker.stats()['state'] == CLOSED
+    assert breaker.timeout() >= 0.1
+
+def test_timeout_starts_when_the_call_runs_not_when_it_queues():
+    breaker = CircuitBreaker('test', min_calls=3, min_timeout=0.05, max_timeout=1.0, max_workers=2)
+    for _ in range(3):
+        breaker.call(lambda: time.sleep(0.01))
+    assert breaker.timeout() == 0.05
+
+    # Ten 20 ms calls on two threads: the last ones queue for ~80 ms
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda i: breaker.call(lambda: time.sleep(0.02) or i), range(10)))
+    assert results == list(range(10))
+    assert breaker.stats()['timeouts'] == 0
+
+class WikipediaTopResultDDGS:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query, **kwargs):
+        time.sleep(0.005)
+        return [{'title': 'Lima - Wikipedia', 'href': 'https://en.wikipedia.org/wiki/Lima', 'body': 'Lima is...'}]
+
+def test_burst_of_lookups_is_queued_and_wikipedia_is_not_charged_to_duckduckgo(monkeypatch):
+    def slow_wikipedia(text):
+        time.sleep(0.05)
+        return "Lima is the capital of Peru."
+
+    ddg = CircuitBreaker('duckduckgo', min_calls=3, min_timeout=0.02, max_timeout=1.0, max_workers=8, max_pending=256)
+    monkeypatch.setattr(search_service, 'answer_cache', TTLCache(max_entries=256))
+    monkeypatch.setattr(search_service, 'DDGS', WikipediaTopResultDDGS)
+    monkeypatch.setattr(search_service, 'search_wikipedia', slow_wikipedia)
+    monkeypatch.setattr(search_service, 'breakers', {'wikipedia': CircuitBreaker('wikipedia'), 'duckduckgo': ddg})
+
+    with ThreadPoolExecutor(max_workers=100) as pool:
+        answers = list(pool.map(lambda i: search_service.search_duckduckgo(f"capital {i}"), range(100)))
+    assert answers == ["According to Wikipedia: Lima is the capital of Peru."] * 100
+    stats = search_service.get_breaker_stats()['duckduckgo']
+    assert stats['rejected'] == 0 and stats['timeouts'] == 0
+    # The DuckDuckGo window only saw the 5 ms searches
+    assert max(seconds for _, seconds in ddg._calls) < 0.04
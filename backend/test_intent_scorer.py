@@ -0,0 +1,44 @@
+import json
+import os
+
+import joblib
+import numpy as np
+
+from backend.core.services.intent_service import FastIntentScorer, IntentClassifier
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_queries():
+    with open(os.path.join(BACKEND_DIR, 'intents.json')) as f:
+        patterns = [p for intent in json.load(f)['intents'] for p in intent['patterns']]
+    return patterns + [
+        "pm of india", "capital of France", "who is Elon Musk", "latest news about SpaceX",
+        "in India", "calculate 5 + 3", "HELLO THERE!!", "thanks, that's all", "", "???",
+        "what time is it in Tokyo", "tell me a joke about cats", "can you help me"
+    ]
+
+def test_fast_scorer_matches_sklearn_pipeline():
+    model = joblib.load(os.path.join(BACKEND_DIR, 'chat_model.pkl'))
+    scorer = FastIntentScorer.load(os.path.join(BACKEND_DIR, 'intent_scorer.npz'))
+    queries = load_queries()
+
+    assert list(scorer.predict(queries)) == list(model.predict(queries))
+    np.testing.assert_allclose(scorer.predict_proba(queries), model.predict_proba(queries), rtol=0, atol=1e-12)
+    assert list(scorer.classes_) == list(model.classes_)
+
+def test_classifier_answers_training_patterns_before_the_model_loads():
+    scorer_path = os.path.join(BACKEND_DIR, 'intent_scorer.npz')
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return FastIntentScorer.load(scorer_path)
+
+    classifier = IntentClassifier(patterns={'how are you': 'greeting'}, loader=loader, load_on_demand=True)
+    assert classifier.classify(["How are you?"]) == [('greeting', 1.0, True)]
+    assert not classifier.ready and not loads
+
+    # The first query that is not a known pattern loads the model, once
+    intent, _, _ = classifier.classify(["what time is it"])[0]
+    classifier.classify(["tell me a joke"])
+    assert intent == 'time' and classifier.ready and loads == [1]
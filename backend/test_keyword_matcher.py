@@ -0,0 +1,50 @@
+import json
+import os
+import random
+
+from backend.core.services.keyword_service import (
+    query_features, INFO_KEYWORDS, TIME_SENSITIVE_WORDS, GREETING_PHRASES
+)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def reference_features(text):
+    # The per-rule scans generate_response used before the compiled matcher
+    text_lower = text.lower()
+    question_words = ['who', 'what', 'where', 'when', 'why', 'how', 'is', 'can', 'does', 'do', 'search', 'tell me']
+    return {
+        'info': any(word in text_lower for word in INFO_KEYWORDS),
+        'time_sensitive': any(w in text_lower for w in TIME_SENSITIVE_WORDS),
+        'greeting_phrase': any(p in text_lower for p in GREETING_PHRASES),
+        'joke': 'joke' in text.lower() or 'laugh' in text.lower(),
+        'identity': any(text_lower.startswith(p) for p in ["who is", "what is", "tell me about", "define"]),
+        'connector': text_lower.startswith(("in ", "at ", "for ", "with ", "about ", "on ", "and ")),
+        'question': any(word in text_lower.split() for word in question_words),
+        'short_greeting': text_lower in ["hi", "hello", "hey", "hey there"],
+        'words': len(text.split())
+    }
+
+def load_queries():
+    with open(os.path.join(BACKEND_DIR, 'intents.json')) as f:
+        queries = [p for intent in json.load(f)['intents'] for p in intent['patterns']]
+
+    queries += [
+        "", "   ", "hi", "Hey There", "5pm meeting", "noweather", "newsnow", "Who Is the PM?",
+        "what's up", "how's it going today", "definition of define", "in India", "In 2020",
+        "tell me about Paris", "tell me a joke", "LAUGH", "stock price now", "upmarket",
+        "search for cats", "what\tis love", "and then?", "on\nthe news"
+    ]
+    # Random splices of rule fragments, to hit overlaps and near misses
+    fragments = INFO_KEYWORDS + TIME_SENSITIVE_WORDS + GREETING_PHRASES + [
+        'who', 'is', 'what', 'in ', 'tell me', 'joke', 'la', 'p', 'n', 'ow', ' ', 'X', "'s", 'def', 'ine'
+    ]
+    rng = random.Random(7)
+    for _ in range(3000):
+        queries.append(''.join(rng.choice(fragments) for _ in range(rng.randint(1, 6))))
+    return queries
+
+def test_matcher_agrees_with_per_rule_scans():
+    for query in load_queries():
+        features = query_features(query)
+        actual = {name: getattr(features, name) for name in reference_features(query)}
+        assert actual == reference_features(query), query
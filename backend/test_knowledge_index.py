@@ -0,0 +1,28 @@
+from backend.core.services.knowledge_service import KnowledgeIndex, build_index, lookup_answer
+
+ENTRIES = [
+    {"title": "Paris", "aliases": ["capital of France"], "answer": "Paris is the capital of France."},
+    {"title": "New Delhi", "aliases": ["capital of India"], "answer": "New Delhi is the capital of India."},
+    {"title": "Mount Everest", "aliases": ["highest mountain"], "answer": "Mount Everest is the highest mountain – 8,849 m."},
+]
+
+def test_index_round_trip(tmp_path):
+    build_index(ENTRIES, str(tmp_path))
+    index = KnowledgeIndex(str(tmp_path))
+
+    answer, score, coverage = index.search("What is the capital of India?", min_coverage=0.85)
+    assert answer == "New Delhi is the capital of India."
+    assert score > 0 and coverage == 1.0
+    assert index.search("everest")[0] == "Mount Everest is the highest mountain – 8,849 m."
+
+    # Partial overlaps in either direction are not answers
+    assert index.search("population of India", min_coverage=0.85) is None
+    assert index.search("in India", min_coverage=0.85) is None
+    assert index.search("who is Elon Musk") is None
+
+def test_bundled_index_answers_evergreen_questions_only():
+    assert lookup_answer("what is the capital of france").startswith("Paris")
+    assert lookup_answer("how tall is mount everest").startswith("Mount Everest")
+    assert lookup_answer("population of Japan") is None
+    # Time-sensitive questions always go to the live backends
+    assert lookup_answer("latest news about the eiffel tower") is None
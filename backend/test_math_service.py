@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager, calculate_math, generate_response
+from backend.core.services.math_service import LimitExceeded, MathError, evaluate, extract_expression, is_expression
+
+@pytest.mark.parametrize("expression, expected", [
+    ("1 + 2 * 3", 7),
+    ("(1 + 2) * 3", 9),
+    ("7 / 2", 3.5),
+    ("2 ^ 3 ^ 2", 512),
+    ("2 ** 10", 1024),
+    ("-2 ^ 2", -4),
+    ("2 ^ -1", 0.5),
+    ("10 mod 3", 1),
+    ("50%", 0.5),
+    ("sqrt 16 + 1", 5),
+    ("10 ^ -16", 1e-16),
+    ("2 ^ -60", 2 ** -60),
+    ("16 ^ 0.5", 4.0),
+    ("0.5 ^ 60", 0.5 ** 60),
+    ("1000000 ^ -2.5", 1e-15),
+])
+def test_evaluate(expression, expected):
+    assert evaluate(expression) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("calculate 12 * 7", "The result is 84"),
+    ("what is 5 times 3?", "The result is 15"),
+    ("square root of 16", "The result is 4"),
+    ("20 percent of 50", "The result is 10"),
+    ("2 to the power of 10", "The result is 1024"),
+    ("100 divided by 8", "The result is 12.5"),
+    ("what's 10 minus 15", "The result is -5"),
+    ("1 / 0", "I can't divide by zero."),
+    ("what is love", "I couldn't calculate that."),
+    ("what is 0.000000001 to the power of -64", "That number is too large for me to calculate."),
+    ("2 to the power of -2", "The result is 0.25"),
+])
+def test_calculate_math(text, expected):
+    assert calculate_math(text) == expected
+
+@pytest.mark.parametrize("expression", [
+    "9**9**9", "9 ^ 99", "10 ^ 16", "0.000000001 ^ -64", "0.1 ^ -16", "2 ^ 50.5", "99999999 * 99999999 * 99999999", "(" * 40 + "1" + ")" * 40, "1+" * 200 + "1",
+])
+def test_limits_are_enforced_quickly(expression):
+    start = time.perf_counter()
+    with pytest.raises(LimitExceeded):
+        evaluate(extract_expression(expression))
+    assert time.perf_counter() - start < 0.01
+
+@pytest.mark.parametrize("expression", ["", "1 +", "(1 + 2", "2 3", "__import__('os')", "sqrt -4"])
+def test_malformed_expressions(expression):
+    with pytest.raises(MathError):
+        evaluate(expression)
+
+def test_spoken_arithmetic_is_answered_without_search(monkeypatch):
+    def no_search(query):
+        raise AssertionError("arithmetic should not reach a search backend")
+    monkeypatch.setattr(chat_service, 'search_wikipedia', no_search)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', no_search)
+
+    manager = ConversationManager()
+    manager.add_message('s1', 'user', 'pm of india')
+    assert generate_response(None, "what is 6 times 7", 's1', manager, {}) == "The result is 42"
+    assert generate_response(None, "5 plus 3", 's1', manager, {}) == "The result is 8"
+
+@pytest.mark.parametrize("text, expected", [
+    ("what is 9/11", False),
+    ("12/25/2024", False),
+    ("what is 1/2/23", False),
+    ("what is 8/2", True),
+    ("what is 10/4", True),
+    ("what is 9 / 11", True),
+    ("what is 30/6", True),
+    ("10/5 + 1", True),
+])
+def test_slash_dates_are_not_arithmetic(text, expected):
+    assert is_expression(text) is expected
+
+def test_small_fractions_are_calculated(monkeypatch):
+    monkeypatch.setattr(chat_service, 'search_wikipedia', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', lambda query: "According to Example: searched.")
+    assert generate_response(None, "what is 8/2", 's2', ConversationManager(), {}) == "The result is 4"
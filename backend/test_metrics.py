@@ -0,0 +1,43 @@
+from backend.core import create_app
+from backend.core.routes import register_routes
+from backend.core.services.chat_service import ConversationManager
+from backend.core.services.metrics_service import Registry, routes_total
+from backend.core.services.tts_service import AudioCache
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests.', labels=('route',))
+    latency = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    requests.inc('math')
+    requests.inc('math')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3.0)
+    registry.collector('cache_hits', 'Cache hits.', 'counter', lambda: {'hit': 3, 'miss': 1}, label='result')
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="math"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 3.55' in text
+    assert 'latency_seconds_count 3' in text
+    assert 'cache_hits{result="miss"} 1' in text
+
+def test_metrics_endpoint_counts_routes(tmp_path):
+    app = create_app(str(tmp_path))
+    register_routes(app, None, {}, ConversationManager(), AudioCache(str(tmp_path)), str(tmp_path))
+    client = app.test_client()
+    before = routes_total.value('math')
+
+    assert client.post('/process', json={'command': 'what is 6 times 7'}).get_json()['response'] == "The result is 42"
+    assert routes_total.value('math') == before + 1
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'echo_request_seconds_count{endpoint="/process"}' in text
+    assert 'echo_stage_seconds_count{stage="math"}' in text
+    assert 'echo_sessions ' in text
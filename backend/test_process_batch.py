@@ -0,0 +1,123 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backend.core import create_app
+from backend.core.routes import MAX_BATCH_COMMANDS, register_routes
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager
+from backend.core.services.intent_service import IntentClassifier, MicroBatcher
+from backend.core.services.tts_service import AudioCache
+
+class StubModel:
+    """Labels 'hello' as a greeting and everything else as a search; records each call's batch."""
+    classes_ = np.array(['greeting', 'search'])
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+        self.entered = threading.Event()
+
+    def predict_proba(self, texts):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append(list(texts))
+        return np.array([[0.9, 0.1] if text == 'hello' else [0.2, 0.8] for text in texts])
+
+def make_client(tmp_path, model=None):
+    app = create_app(str(tmp_path))
+    register_routes(app, model, {'greeting': ("Hi there!",)}, ConversationManager(), AudioCache(str(tmp_path)), str(tmp_path))
+    return app.test_client()
+
+@pytest.fixture
+def searches(monkeypatch):
+    queries = []
+    monkeypatch.setattr(chat_service, 'SEARCH_MODE', 'serial')
+    monkeypatch.setattr(chat_service, 'lookup_answer', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_wikipedia', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', lambda query: queries.append(query) or f"Found: {query}")
+    return queries
+
+def test_batch_classifies_once_and_answers_in_order(tmp_path, searches):
+    stub = StubModel()
+    client = make_client(tmp_path, IntentClassifier(stub, thresholds={'greeting': 0.5}))
+    response = client.post('/process_batch', json={'commands': ['hello', 'what is 6 times 7']})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['command'], r['intent'], r['response']) for r in results] == [
+        ('hello', 'greeting', "Hi there!"),
+        ('what is 6 times 7', 'search', "The result is 42"),
+    ]
+    assert stub.calls == [['hello', 'what is 6 times 7']]
+
+def test_follow_ups_in_a_batch_see_the_earlier_commands(tmp_path, searches):
+    client = make_client(tmp_path)
+    response = client.post('/process_batch', json={
+        'session_id': 'batch', 'commands': ['what do we celebrate on August 15', 'in India']
+    })
+    assert response.status_code == 200
+    assert searches == ['what do we celebrate on August 15', 'what do we celebrate on August 15 in India']
+
+@pytest.mark.parametrize("commands", [[], 'hello', ['hello'] * (MAX_BATCH_COMMANDS + 1)])
+def test_bad_batches_are_rejected(tmp_path, commands):
+    response = make_client(tmp_path).post('/process_batch', json={'commands': commands})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_micro_batcher_gathers_concurrent_predictions():
+    gate = threading.Event()
+    stub = StubModel(gate)
+    batcher = MicroBatcher(stub, max_batch=8)
+    texts = ['first', 'hello', 'search this', 'hello']
+    results = [None] * len(texts)
+
+    def predict(i):
+        results[i] = batcher.predict([texts[i]])[0]
+
+    threads = [threading.Thread(target=predict, args=(0,))]
+    threads[0].start()
+    assert stub.entered.wait(2)  # the worker has taken 'first' and is blocked in the model
+    for i in range(1, len(texts)):
+        threads.append(threading.Thread(target=predict, args=(i,)))
+        threads[-1].start()
+    deadline = time.monotonic() + 2
+    while batcher._queue.qsize() < len(texts) - 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    # Everything that queued up while the first batch ran went out as one call
+    assert stub.calls == [['first'], ['hello', 'search this', 'hello']]
+    assert results == ['search', 'greeting', 'search', 'greeting']
+    assert batcher.stats() == {'batches': 2, 'items': 4, 'avg_batch': 2.0}
+
+def test_micro_batcher_passes_model_errors_to_every_caller():
+    class Broken:
+        classes_ = StubModel.classes_
+
+        def predict_proba(self, texts):
+            raise ValueError("model failed")
+
+    batcher = MicroBatcher(Broken())
+    with pytest.raises(ValueError):
+        batcher.predict(['hello'])
+    # Requests that are already a batch skip the queue
+    with pytest.raises(ValueError):
+        batcher.predict_proba(['a', 'b'])
+
+def test_a_bad_command_rejects_the_batch_before_anything_runs(tmp_path, searches):
+    manager = ConversationManager()
+    app = create_app(str(tmp_path))
+    register_routes(app, None, {}, manager, AudioCache(str(tmp_path)), str(tmp_path))
+    response = app.test_client().post('/process_batch', json={
+        'session_id': 'bad', 'commands': ['who won the world cup in 1930', {'x': 1}]
+    })
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Commands must be strings', 'success': False}
+    assert manager.get_history('bad') == []
+    assert searches == []
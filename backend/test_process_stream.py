@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from backend.core import create_app
+from backend.core.routes import register_routes
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager
+from backend.core.services.tts_service import AudioCache
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def make_client(tmp_path):
+    app = create_app(str(tmp_path))
+    register_routes(app, None, {}, ConversationManager(), AudioCache(str(tmp_path)), str(tmp_path))
+    return app.test_client()
+
+def test_stream_sends_intent_then_answer(tmp_path):
+    response = make_client(tmp_path).post('/process/stream', json={'command': 'what is 6 times 7'})
+    assert response.mimetype == 'text/event-stream'
+    assert parse_events(response.get_data(as_text=True)) == [
+        ('intent', {'intent': None, 'confidence': None}),
+        ('answer', {'response': "The result is 42", 'intent': None, 'confidence': None, 'success': True}),
+    ]
+
+def test_stream_reports_searching_before_a_remote_lookup(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_service, 'SEARCH_MODE', 'serial')
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', lambda query: "According to Example: FIFA.")
+
+    response = make_client(tmp_path).post('/process/stream', json={'command': 'who won the world cup in 1930'})
+    names = [name for name, _ in parse_events(response.get_data(as_text=True))]
+    assert names == ['intent', 'status', 'answer']
+    assert parse_events(response.get_data(as_text=True))[-1][1]['response'] == "According to Example: FIFA."
+
+def test_identity_miss_reports_searching_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_service, 'SEARCH_MODE', 'serial')
+    monkeypatch.setattr(chat_service, 'lookup_answer', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_wikipedia', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', lambda query: "According to Example: a chemist.")
+
+    # Wikipedia misses, so the reply goes on to a web search
+    response = make_client(tmp_path).post('/process/stream', json={'command': 'who is zarvex quintaro'})
+    events = parse_events(response.get_data(as_text=True))
+    assert [name for name, _ in events] == ['intent', 'status', 'answer']
+    assert events[-1][1]['response'] == "According to Example: a chemist."
+
+@pytest.mark.parametrize("body", ['null', '[]', '"hello"'])
+def test_stream_rejects_a_body_that_is_not_an_object(tmp_path, body):
+    response = make_client(tmp_path).post('/process/stream', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'error': 'Invalid request', 'success': False}
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager, generate_response, race_search
+from backend.core.services.search_service import NO_RESULTS_MESSAGE
+
+DEADLINE = 0.2
+WIKI = "Lima is the capital of Peru."
+DDG = "According to Peru: Lima."
+
+@pytest.fixture
+def release():
+    # Backends that outlive the deadline block on this; free their pool threads afterwards
+    event = threading.Event()
+    yield event
+    event.set()
+
+def backend(result, delay=0.0, release=None):
+    def search(query):
+        if release is not None:
+            release.wait()
+        time.sleep(delay)
+        return result
+    return search
+
+def race(monkeypatch, wikipedia, duckduckgo):
+    monkeypatch.setattr(chat_service, 'search_wikipedia', wikipedia)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', duckduckgo)
+    started = time.monotonic()
+    answer = race_search("capital of peru", started + DEADLINE, include_wikipedia=True)
+    return answer, time.monotonic() - started
+
+def test_wikipedia_outranks_a_faster_duckduckgo(monkeypatch):
+    answer, elapsed = race(monkeypatch, backend(WIKI, delay=0.05), backend(DDG))
+    assert answer == f"According to Wikipedia: {WIKI}"
+    assert elapsed < DEADLINE
+
+def test_duckduckgo_answers_when_wikipedia_finishes_late(monkeypatch, release):
+    answer, elapsed = race(monkeypatch, backend(WIKI, release=release), backend(DDG))
+    assert answer == DDG
+    assert DEADLINE <= elapsed < DEADLINE + 0.1
+
+def test_wikipedia_miss_does_not_wait_for_the_deadline(monkeypatch):
+    answer, elapsed = race(monkeypatch, backend(None), backend(DDG, delay=0.02))
+    assert answer == DDG
+    assert elapsed < DEADLINE
+
+def test_falls_back_to_the_last_backends_message(monkeypatch):
+    answer, elapsed = race(monkeypatch, backend(None), backend(NO_RESULTS_MESSAGE))
+    assert answer == NO_RESULTS_MESSAGE
+    assert elapsed < DEADLINE
+
+def test_failed_backend_is_skipped(monkeypatch):
+    def broken(query):
+        raise ConnectionError("rate limited")
+    answer, _ = race(monkeypatch, broken, backend(DDG))
+    assert answer == DDG
+
+def test_nothing_in_time_returns_none_at_the_deadline(monkeypatch, release):
+    answer, elapsed = race(monkeypatch, backend(WIKI, release=release), backend(DDG, release=release))
+    assert answer is None
+    assert DEADLINE <= elapsed < DEADLINE + 0.1
+
+def test_identity_race_result_is_not_searched_again(monkeypatch, release):
+    calls = []
+    monkeypatch.setattr(chat_service, 'SEARCH_MODE', 'race')
+    monkeypatch.setattr(chat_service, 'SEARCH_DEADLINE', DEADLINE)
+    monkeypatch.setattr(chat_service, 'lookup_answer', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_wikipedia', backend(WIKI, release=release))
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', lambda query: calls.append(query) or NO_RESULTS_MESSAGE)
+
+    # Wikipedia misses the deadline; DuckDuckGo's answer from the race is the reply
+    reply = generate_response(None, "who is zarvex quintaro", 'race', ConversationManager(), {})
+    assert reply == NO_RESULTS_MESSAGE
+    assert calls == ["who is zarvex quintaro"]
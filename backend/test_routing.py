@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from backend.core.services import chat_service
+from backend.core.services.chat_service import ConversationManager, generate_response
+from backend.core.services.intent_service import IntentClassifier, is_exact_pattern
+
+RESPONSES = {
+    'greeting': ("Hello!",),
+    'thanks': ("Anytime!",),
+    'goodbye': ("Farewell!",),
+    'help': ("I can answer questions and tell the time.",),
+}
+SEARCHED = "According to Example: searched."
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'responses.json')) as f:
+    PATTERNS = json.load(f)['patterns']
+
+@pytest.fixture
+def searches(monkeypatch):
+    queries = []
+
+    def search(query):
+        queries.append(query)
+        return SEARCHED
+
+    monkeypatch.setattr(chat_service, 'SEARCH_MODE', 'serial')
+    monkeypatch.setattr(chat_service, 'lookup_answer', lambda query: None)
+    monkeypatch.setattr(chat_service, 'search_duckduckgo', search)
+    monkeypatch.setattr(chat_service, 'search_wikipedia', lambda query: None)
+    return queries
+
+@pytest.mark.parametrize("intent, text", [
+    ('greeting', "hi how tall is the burj khalifa"),
+    ('thanks', "thanks, how far is jupiter"),
+    ('greeting', "good morning, where is tokyo"),
+    ('goodbye', "bye, when does the store close"),
+    ('help', "help me find the nearest hospital"),
+    ('greeting', "hey search for cats"),
+    ('greeting', "hello, is it raining"),
+    ('greeting', "hi search python tutorials"),
+    ('thanks', "thanks does it rain"),
+    ('help', "help me find hospitals"),
+])
+def test_confident_small_talk_with_a_question_is_searched(searches, intent, text):
+    reply = generate_response(intent, text, 'routing', ConversationManager(), RESPONSES, confident=True)
+    assert reply == SEARCHED
+    assert searches == [text]
+
+@pytest.mark.parametrize("intent, text, expected", [
+    ('greeting', "hello", "Hello!"),
+    ('greeting', "how are you", "Hello!"),
+    ('thanks', "thank you", "Anytime!"),
+])
+def test_confident_small_talk_is_answered_locally(searches, intent, text, expected):
+    assert generate_response(intent, text, 'routing', ConversationManager(), RESPONSES, confident=True) == expected
+    assert searches == []
+
+@pytest.mark.parametrize("intent, text", [
+    ('thanks', "Thank you so much!"),
+    ('goodbye', "see you later"),
+    ('help', "can you help me"),
+    ('help', "help me please"),
+])
+def test_exact_training_patterns_are_answered_locally(searches, intent, text):
+    exact = is_exact_pattern(IntentClassifier(patterns=PATTERNS), text, intent)
+    assert exact
+    reply = generate_response(intent, text, 'routing', ConversationManager(), RESPONSES, confident=True, exact=exact)
+    assert reply == RESPONSES[intent][0]
+    assert searches == []
+
+def test_pattern_of_another_intent_is_not_exact():
+    assert not is_exact_pattern(IntentClassifier(patterns=PATTERNS), "can you help me", 'greeting')
+    assert not is_exact_pattern(None, "can you help me", 'help')
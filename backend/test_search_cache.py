@@ -0,0 +1,89 @@
+import threading
+import time
+
+from backend.core.services import search_service
+from backend.core.services.cache_service import TTLCache, SingleFlight, MISSING
+
+def test_ttl_cache_lru_and_expiry():
+    cache = TTLCache(max_entries=2, default_ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' is now most recently used
+    cache.set('c', 3)           # evicts 'b'
+    assert cache.get('b') is MISSING
+    assert cache.get('c') == 3
+
+    cache.set('short', 'x', ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is MISSING
+
+    stats = cache.stats()
+    assert stats['evictions'] == 2
+    assert stats['expirations'] == 1
+    assert stats['hits'] == 2
+
+class FakeDDGS:
+    calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query, **kwargs):
+        FakeDDGS.calls.append((query, kwargs['timelimit']))
+        return [{'title': 'Paris', 'href': 'https://example.com', 'body': 'Capital of France.'}]
+
+def test_search_duckduckgo_is_cached_by_normalized_query(monkeypatch):
+    monkeypatch.setattr(search_service, 'DDGS', FakeDDGS)
+    monkeypatch.setattr(search_service, 'answer_cache', TTLCache(max_entries=8))
+    FakeDDGS.calls = []
+
+    first = search_service.search_duckduckgo("capital of France")
+    second = search_service.search_duckduckgo("  Capital of   france ")
+    assert first == second == "According to Paris: Capital of France."
+    assert len(FakeDDGS.calls) == 1
+
+    search_service.search_duckduckgo("latest news about France")
+    assert FakeDDGS.calls[-1][1] == 'd'
+
+def test_connection_errors_are_not_cached(monkeypatch):
+    class BrokenDDGS(FakeDDGS):
+        def text(self, query, **kwargs):
+            raise ConnectionError("offline")
+
+    monkeypatch.setattr(search_service, 'DDGS', BrokenDDGS)
+    monkeypatch.setattr(search_service, 'answer_cache', TTLCache(max_entries=8))
+
+    assert search_service.search_duckduckgo("capital of Peru") == search_service.CONNECTION_ERROR_MESSAGE
+    assert len(search_service.answer_cache) == 0
+
+def test_concurrent_misses_share_one_upstream_call(monkeypatch):
+    release = threading.Event()
+
+    class SlowDDGS(FakeDDGS):
+        def text(self, query, **kwargs):
+            release.wait(timeout=5)
+            return super().text(query, **kwargs)
+
+    monkeypatch.setattr(search_service, 'DDGS', SlowDDGS)
+    monkeypatch.setattr(search_service, 'answer_cache', TTLCache(max_entries=8))
+    monkeypatch.setattr(search_service, 'inflight', SingleFlight())
+    FakeDDGS.calls = []
+
+    results = []
+    workers = [
+        threading.Thread(target=lambda: results.append(search_service.search_duckduckgo("capital of France")))
+        for _ in range(8)
+    ]
+    for worker in workers:
+        worker.start()
+    while search_service.inflight.stats()['coalesced'] < 7:
+        time.sleep(0.001)
+    release.set()
+    for worker in workers:
+        worker.join()
+
+    assert len(FakeDDGS.calls) == 1
+    assert results == ["According to Paris: Capital of France."] * 8
@@ -0,0 +1,98 @@
+import os
+import time
+
+from backend.core.services.chat_service import ConversationManager, generate_response
+from backend.core.services.session_store import Message, create_session_store
+
+def test_sqlite_store_is_shared_between_managers(tmp_path):
+    url = 'sqlite:///' + os.path.join(str(tmp_path), 'sessions.db')
+    # Two managers over one file stand in for two gunicorn workers
+    worker_a = ConversationManager(store=create_session_store(url, max_history=4))
+    worker_b = ConversationManager(store=create_session_store(url, max_history=4))
+
+    worker_a.add_exchange('s1', 'hello', 'Hi there!', 'greeting')
+    worker_a.add_exchange('s1', 'what time is it', 'It is noon.', 'time')
+
+    history = worker_b.get_history('s1')
+    assert [m.message for m in history] == ['hello', 'Hi there!', 'what time is it', 'It is noon.']
+
+    exported = worker_b.export_session('s1')
+    assert exported['analytics']['total_messages'] == 4
+    assert exported['analytics']['commands_used'] == {'greeting': 2, 'time': 2}
+
+    # History is capped at max_history
+    worker_b.add_message('s1', 'user', 'one more')
+    assert [m.message for m in worker_a.get_history('s1')][0] == 'Hi there!'
+
+    worker_b.clear_session('s1')
+    assert worker_a.get_history('s1') == []
+    assert worker_a.export_session('s1') is None
+
+def test_follow_up_context_survives_a_worker_switch(tmp_path, monkeypatch):
+    url = 'sqlite:///' + os.path.join(str(tmp_path), 'sessions.db')
+    worker_a = ConversationManager(store=create_session_store(url))
+    worker_b = ConversationManager(store=create_session_store(url))
+
+    searched = []
+    monkeypatch.setattr('backend.core.services.chat_service.search_duckduckgo', lambda q: searched.append(q) or 'ok')
+
+    worker_a.add_exchange('s2', 'what do we celebrate on August 15', 'Independence Day.', None)
+    generate_response(None, 'in India', 's2', worker_b, {})
+    assert searched == ['what do we celebrate on August 15 in India']
+
+def test_idle_sessions_expire():
+    store = create_session_store('memory', session_ttl=0.3, num_shards=1)
+    manager = ConversationManager(store=store)
+    manager.add_message('old', 'user', 'hello')
+    time.sleep(0.2)
+    manager.add_message('recent', 'user', 'hi')
+
+    time.sleep(0.15)
+    # Nothing touched the shard since 'old' expired; stats() must not count it
+    assert store.stats()['resident'] == 1
+    assert store.stats()['expirations'] == 1
+    assert manager.export_session('old') is None
+    assert [m.message for m in manager.get_history('recent')] == ['hi']
+
+def test_session_cap_evicts_least_recently_used():
+    store = create_session_store('memory', max_sessions=3, num_shards=1)
+    for session_id in ('a', 'b', 'c'):
+        store.get_session(session_id)
+    store.get_session('a')  # used again
+    store.get_session('d')
+
+    assert store.export_session('b') is None
+    assert store.export_session('a') is not None
+    assert store.stats()['resident'] == 3
+    assert store.stats()['evictions'] == 1
+
+def test_sessions_spread_over_shards_with_a_per_shard_cap():
+    store = create_session_store('memory', max_sessions=400, num_shards=4)
+    for i in range(400):
+        store.get_session(f"user-{i}")
+    sizes = [len(shard.sessions) for shard in store._shards]
+    assert all(size > 50 for size in sizes)
+    # Each stripe holds at most its share of the cap
+    assert all(size <= 100 for size in sizes)
+    assert sum(sizes) + store.stats()['evictions'] == 400
+
+def test_sqlite_store_expires_and_caps_sessions_for_every_worker(tmp_path):
+    url = 'sqlite:///' + os.path.join(str(tmp_path), 'sessions.db')
+    worker_a = create_session_store(url, session_ttl=0.2, max_sessions=2, sweep_interval=0)
+    worker_b = create_session_store(url, session_ttl=0.2, max_sessions=2, sweep_interval=0)
+    message = lambda text: [Message('user', text)]
+
+    worker_a.add_messages('idle', message('hello'))
+    time.sleep(0.25)
+    assert worker_b.get_history('idle') == []
+    assert worker_b.stats()['resident'] == 0
+
+    for session_id in ('s1', 's2', 's3'):
+        worker_a.add_messages(session_id, message('hi'))
+        time.sleep(0.01)
+    # The sweep dropped the expired session and the oldest one over the cap
+    assert worker_a.stats()['expirations'] == 1
+    assert worker_a.stats()['evictions'] == 1
+    assert worker_b.export_session('s1') is None
+    assert [m.message for m in worker_b.get_history('s3')] == ['hi']
+    assert worker_b.stats()['resident'] == 2
@@ -1,11 +1,17 @@
 import json
+import os
 import pickle
+import sys
 import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 
+# Allow running as `python backend/train_model.py` from the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.core.services.intent_service import export_scorer, learn_thresholds, pattern_key
+
 print("Loading intents...")
 with open('backend/intents.json', 'r') as file:
     data = json.load(file)
@@ -44,4 +50,27 @@ print("Saving artifacts...")
 joblib.dump(model, 'backend/chat_model.pkl')
 joblib.dump(responses, 'backend/responses.pkl')
 
+# Compact NumPy artifact used by FastIntentScorer at serve time
+export_scorer(model, 'backend/intent_scorer.npz')
+
+# Response table and exact training patterns, loaded at startup without
+# joblib or sklearn. Patterns shared by several intents are left out.
+patterns = {}
+for sentence, label in zip(training_sentences, training_labels):
+    key = pattern_key(sentence)
+    patterns[key] = label if patterns.get(key, label) == label else None
+with open('backend/responses.json', 'w') as file:
+    json.dump({
+        'responses': responses,
+        'patterns': {key: label for key, label in patterns.items() if key and label}
+    }, file, indent=2, ensure_ascii=False)
+    file.write('\n')
+
+# Per-intent confidence thresholds for routing, learned on held-out folds
+thresholds = learn_thresholds(model, training_sentences, training_labels)
+print("Intent thresholds:", thresholds)
+with open('backend/intent_thresholds.json', 'w') as file:
+    json.dump(thresholds, file, indent=2)
+    file.write('\n')
+
 print("Training Complete! Model saved to backend/chat_model.pkl")
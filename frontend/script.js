@@ -154,21 +154,7 @@ async function processCommand(command) {
     statusText.style.color = 'var(--accent-secondary)';
 
     try {
-        const response = await fetch(`${API_BASE_URL}/process`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            },
-            body: JSON.stringify({
-                command: command,
-                session_id: SESSION_ID
-            })
-        });
-
-        if (!response.ok) throw new Error('Network response was not ok');
-
-        const data = await response.json();
+        const data = await requestResponse(command);
 
         removeTypingIndicator();
 
@@ -191,6 +177,84 @@ async function processCommand(command) {
     }
 }
 
+// Streams progress from /process/stream (Server-Sent Events) so the status line can
+// say when a web search is under way; falls back to plain /process if the stream
+// cannot be opened (e.g. an older backend or a proxy that rejects it).
+async function requestResponse(command) {
+    const answer = await streamResponse(command);
+    if (answer) return answer;
+
+    const response = await fetch(`${API_BASE_URL}/process`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        },
+        body: JSON.stringify({
+            command: command,
+            session_id: SESSION_ID
+        })
+    });
+
+    if (!response.ok) throw new Error('Network response was not ok');
+    return response.json();
+}
+
+async function streamResponse(command) {
+    let response;
+    try {
+        response = await fetch(`${API_BASE_URL}/process/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+                command: command,
+                session_id: SESSION_ID,
+                tts: talkBackEnabled // synthesize the first sentence while the answer is typed
+            })
+        });
+    } catch (error) {
+        console.warn('Streaming unavailable, using /process:', error);
+        return null;
+    }
+
+    if (!response.ok || !response.body) return null;
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        // The command was already processed; don't send it again
+        if (done) throw new Error('Stream ended without an answer');
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let name = 'message';
+            let payload = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) name = line.slice(7);
+                else if (line.startsWith('data: ')) payload += line.slice(6);
+            }
+            const data = payload ? JSON.parse(payload) : {};
+
+            if (name === 'status' && data.status === 'searching') {
+                statusText.textContent = 'Searching the web...';
+            } else if (name === 'answer' || name === 'error') {
+                reader.cancel().catch(() => {});
+                return data;
+            }
+        }
+    }
+}
+
 function addMessage(text, sender) {
     const msgDiv = document.createElement('div');
     msgDiv.className = `msg ${sender}`;
@@ -239,35 +303,37 @@ function escapeHtml(text) {
 }
 
 // --- Backend TTS ---
-async function playBackendTTS(text) {
-    if (!talkBackEnabled) return;
-    try {
-        const response = await fetch(`${API_BASE_URL}/tts`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ text: text })
-        });
-
-        if (response.ok) {
-            const data = await response.json();
-            if (data.success && data.audio_url) {
-                const audio = new Audio(API_BASE_URL + data.audio_url);
-                audio.play();
-                statusText.textContent = 'Speaking...';
-                statusText.style.color = 'var(--accent-primary)';
-
-                audio.onended = () => {
-                    if (!isListening) {
-                        statusText.textContent = 'Tap to speak';
-                        statusText.style.color = 'var(--text-secondary)';
-                    }
-                };
+// Streams sentence-by-sentence audio so playback starts after the first sentence
+function playBackendTTS(text) {
+    if (!talkBackEnabled) return Promise.resolve();
+    return new Promise(resolve => {
+        const audio = new Audio(`${API_BASE_URL}/tts/stream?text=${encodeURIComponent(text)}`);
+        let failed = false;
+
+        const fallback = (e) => {
+            if (failed) return;
+            failed = true;
+            console.error("TTS Error:", e);
+            speakFallback(text);
+            resolve();
+        };
+
+        audio.onplaying = () => {
+            statusText.textContent = 'Speaking...';
+            statusText.style.color = 'var(--accent-primary)';
+            resolve();
+        };
+
+        audio.onended = () => {
+            if (!isListening) {
+                statusText.textContent = 'Tap to speak';
+                statusText.style.color = 'var(--text-secondary)';
             }
-        }
-    } catch (e) {
-        console.error("TTS Error:", e);
-        speakFallback(text);
-    }
+        };
+
+        audio.onerror = () => fallback(audio.error);
+        audio.play().catch(fallback);
+    });
 }
 
 function speakFallback(text) {